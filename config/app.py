@@ -0,0 +1,30 @@
+# Application configuration
+import os
+
+APP_CONFIG = {
+    # Load model OCR và model khuôn mặt (dlib) ở thread nền ngay khi mở ứng dụng,
+    # đặt APP_WARMUP=0 để chỉ load khi dùng lần đầu (tiết kiệm RAM khi chỉ xem danh sách)
+    'warmup': os.environ.get('APP_WARMUP', '1') == '1',
+    # Số worker process của python -m src.extraction.batch (mỗi worker load 1 OCR model)
+    'batch_workers': int(os.environ.get('BATCH_WORKERS', max(1, (os.cpu_count() or 2) // 2))),
+    # Chu kỳ (giây) face index kiểm tra sinh viên được thêm/sửa/xóa từ máy khác
+    'face_index_sync_interval': float(os.environ.get('FACE_INDEX_SYNC_INTERVAL', '5')),
+    # exact: quét toàn bộ encoding (đủ nhanh tới ~100k sinh viên)
+    # ivf: tìm gần đúng theo cụm cho số lượng rất lớn, FACE_INDEX_NPROBE lớn hơn = recall cao hơn, chậm hơn
+    # (đo bằng: python -m src.face_matching.face_index)
+    'face_index': os.environ.get('FACE_INDEX', 'exact'),
+    'face_index_nlist': int(os.environ.get('FACE_INDEX_NLIST', '0')),  # 0 = tự chọn ~sqrt(N)
+    'face_index_nprobe': int(os.environ.get('FACE_INDEX_NPROBE', '8')),
+    # Số sinh viên mỗi trang của cửa sổ danh sách (tải thêm khi cuộn xuống)
+    'student_list_page_size': int(os.environ.get('STUDENT_LIST_PAGE_SIZE', '200')),
+    # Tỉ lệ thu nhỏ ảnh trước khi detect khuôn mặt, thử lần lượt tới khi tìm thấy; encoding vẫn
+    # tính trên ảnh gốc (đo bằng: python -m src.face_matching.face_detection <thư mục ảnh thẻ>)
+    'face_detect_scales': tuple(float(scale) for scale in os.environ.get('FACE_DETECT_SCALES', '0.5,1.0').split(',')),
+    'card_face_detect_scales': tuple(
+        float(scale) for scale in os.environ.get('CARD_FACE_DETECT_SCALES', '1.0').split(',')
+    ),
+    # Số frame camera được tìm kiếm cùng lúc, frame đến khi worker đang bận chỉ giữ frame mới nhất
+    'camera_search_workers': int(os.environ.get('CAMERA_SEARCH_WORKERS', '1')),
+    # Tự chạy migration schema database khi mở ứng dụng (python -m src.database.migrations)
+    'db_auto_migrate': os.environ.get('DB_AUTO_MIGRATE', '1') == '1',
+}
@@ -1,12 +1,29 @@
 # Database configuration
+import os
 
 DB_CONFIG = {
     'host': 'localhost',
     'port': 3306,
     'user': 'root',
-    'password': '',  
+    'password': '',
     'database': 'student_card_db',
     'charset': 'utf8mb4',
     'collation': 'utf8mb4_unicode_ci'
 }
 
+# Connection pool (mỗi thao tác database mượn 1 connection riêng từ pool)
+DB_POOL_CONFIG = {
+    # Số connection tối đa (mysql-connector giới hạn 32)
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', '5')),
+    # Thời gian tối đa (giây) chờ connection rảnh khi pool đã dùng hết
+    'acquire_timeout': float(os.environ.get('DB_ACQUIRE_TIMEOUT', '10')),
+    # Số lần thử kết nối lại khi mất kết nối, chờ backoff, 2*backoff, 4*backoff... giây giữa các lần
+    'reconnect_attempts': int(os.environ.get('DB_RECONNECT_ATTEMPTS', '3')),
+    'reconnect_backoff': float(os.environ.get('DB_RECONNECT_BACKOFF', '0.5')),
+    # Số connection dành cho AsyncStudentDAO (các coroutine tìm kiếm dùng chung, không tạo thread mới)
+    'async_workers': int(os.environ.get('DB_ASYNC_WORKERS', '3')),
+}
+
+# Số giây giữa các lần StudentDAO kiểm tra lại schema khi database chưa migrate đủ
+# (thấy được migration chạy từ máy khác mà không cần khởi động lại)
+DB_SCHEMA_CHECK_INTERVAL = float(os.environ.get('DB_SCHEMA_CHECK_INTERVAL', '60'))
@@ -0,0 +1,28 @@
+# OCR engine configuration
+import os
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_VIETOCR_CONFIG_DIR = os.path.join(_ROOT, 'src', 'vietocr', 'config_text_recognition')
+
+OCR_CONFIG = {
+    # vietocr_seq2seq | vietocr_transformer | vendored_transformer | torchscript_transformer
+    # Có thể đổi không cần sửa code bằng biến môi trường OCR_BACKEND
+    'backend': os.environ.get('OCR_BACKEND', 'vietocr_seq2seq'),
+    # cpu, cuda, cuda:0
+    'device': os.environ.get('OCR_DEVICE', 'cpu'),
+    # Lượng tử hóa int8 (chỉ CPU), kiểm tra độ chính xác bằng: python -m src.vietocr.tool.quantize <folder>
+    'quantize': os.environ.get('OCR_QUANTIZE', '0') == '1',
+    # Thư mục cache config/weights của VietOCR (tải 1 lần, các lần sau đọc từ đây)
+    'cache_dir': os.environ.get('OCR_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'vietocr')),
+    # Không truy cập mạng (máy air-gapped): chỉ dùng config/weights đã có trong cache
+    'offline': os.environ.get('OCR_OFFLINE', '0') == '1',
+}
+
+# Config cho model vgg-transformer vendored trong src/vietocr
+text_recognition = {
+    'base_config': os.path.join(_VIETOCR_CONFIG_DIR, 'base.yml'),
+    'vgg_config': os.path.join(_VIETOCR_CONFIG_DIR, 'vgg-transformer.yml'),
+    'model_weight': os.environ.get('OCR_MODEL_WEIGHT', os.path.join(_ROOT, 'weights', 'transformerocr.pth')),
+    # Output của: python -m src.vietocr.tool.export
+    'torchscript_dir': os.environ.get('OCR_TORCHSCRIPT_DIR', os.path.join(_ROOT, 'weights', 'torchscript')),
+}
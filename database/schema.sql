@@ -12,8 +12,26 @@ CREATE TABLE IF NOT EXISTS students (
     ngay_het_han DATE,
     avatar_path TEXT,
     face_encoding BLOB,
+    -- Cột sinh (không lưu) để index được điều kiện "có face encoding"
+    has_encoding TINYINT(1) AS (face_encoding IS NOT NULL) VIRTUAL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_mssv (mssv),
-    INDEX idx_ho_ten (ho_ten)
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_ho_ten (ho_ten),
+    INDEX idx_updated_at (updated_at),
+    INDEX idx_has_encoding_updated (has_encoding, updated_at),
+    INDEX idx_created_at (created_at),
+    INDEX idx_ngay_het_han (ngay_het_han)
 );
 
+-- Token tên không dấu (vd. "Nguyễn Văn Đức" -> nguyen, van, duc) cho tìm kiếm theo tên:
+-- token LIKE 'ngu%' là range scan trên primary key, không quét toàn bảng students
+CREATE TABLE IF NOT EXISTS student_name_tokens (
+    token VARCHAR(50) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+    student_id INT NOT NULL,
+    PRIMARY KEY (token, student_id),
+    INDEX idx_student_id (student_id),
+    FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+);
+
+-- Database tạo từ schema cũ: không sửa tay, chạy migration (ứng dụng cũng tự chạy khi khởi động):
+--     python -m src.database.migrations
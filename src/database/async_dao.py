@@ -0,0 +1,131 @@
+"""
+Phiên bản asyncio của StudentDAO cho các luồng tìm kiếm (camera, upload ảnh):
+
+    students = await AsyncStudentDAO.get_by_ids([1, 2, 3])
+
+Mọi method public của StudentDAO đều có bản coroutine cùng tên và tham số (get_all_names trả về
+list thay vì generator, để việc đọc database không chạy trên event loop). Thay vì 1 thread
+cho mỗi lần tìm kiếm, các coroutine chờ lượt trên 1 executor cố định DB_POOL_CONFIG['async_workers']
+thread, mỗi thread giữ tối đa 1 connection của db_manager, nên nhiều lần tìm kiếm chồng nhau
+chỉ dùng vài connection.
+"""
+import asyncio
+import functools
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .student_dao import StudentDAO
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.database import DB_POOL_CONFIG
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, DB_POOL_CONFIG['async_workers']),
+                                           thread_name_prefix='async-db')
+        return _executor
+
+
+async def run_db(func, *args, **kwargs):
+    """Chạy 1 hàm database đồng bộ trên executor dành cho database, không chặn event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def shutdown():
+    """Dừng executor (chờ các truy vấn đang chạy xong)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True)
+            _executor = None
+
+
+class AsyncStudentDAO:
+    """Async DAO cho students: cùng method với StudentDAO, mỗi method là coroutine"""
+
+    @staticmethod
+    async def create(student_data):
+        return await run_db(StudentDAO.create, student_data)
+
+    @staticmethod
+    async def get_by_id(student_id):
+        return await run_db(StudentDAO.get_by_id, student_id)
+
+    @staticmethod
+    async def get_by_mssv(mssv):
+        return await run_db(StudentDAO.get_by_mssv, mssv)
+
+    @staticmethod
+    async def get_all():
+        return await run_db(StudentDAO.get_all)
+
+    @staticmethod
+    async def get_page(after=None, page_size=200):
+        return await run_db(StudentDAO.get_page, after, page_size)
+
+    @staticmethod
+    async def get_expiring(before, after=None):
+        return await run_db(StudentDAO.get_expiring, before, after)
+
+    @staticmethod
+    async def get_all_with_encodings():
+        return await run_db(StudentDAO.get_all_with_encodings)
+
+    @staticmethod
+    async def get_encoding_sync_state():
+        return await run_db(StudentDAO.get_encoding_sync_state)
+
+    @staticmethod
+    async def load_encodings(chunk_size=5000):
+        return await run_db(StudentDAO.load_encodings, chunk_size)
+
+    @staticmethod
+    async def load_encodings_changed_since(min_id, updated_since=None):
+        return await run_db(StudentDAO.load_encodings_changed_since, min_id, updated_since)
+
+    @staticmethod
+    async def load_encodings_by_ids(student_ids, batch_size=1000):
+        return await run_db(StudentDAO.load_encodings_by_ids, student_ids, batch_size)
+
+    @staticmethod
+    async def get_by_ids(student_ids):
+        return await run_db(StudentDAO.get_by_ids, student_ids)
+
+    @staticmethod
+    async def get_ids_with_encodings():
+        return await run_db(StudentDAO.get_ids_with_encodings)
+
+    @staticmethod
+    async def update(student_id, student_data):
+        return await run_db(StudentDAO.update, student_id, student_data)
+
+    @staticmethod
+    async def upsert_many(students, update_existing=True, chunk_size=500):
+        return await run_db(StudentDAO.upsert_many, students, update_existing, chunk_size)
+
+    @staticmethod
+    async def delete(student_id):
+        return await run_db(StudentDAO.delete, student_id)
+
+    @staticmethod
+    async def get_all_names(chunk_size=5000):
+        # StudentDAO.get_all_names là generator: đọc hết trên executor
+        return await run_db(lambda: list(StudentDAO.get_all_names(chunk_size)))
+
+    @staticmethod
+    async def search_by_name(keyword, limit=None):
+        return await run_db(StudentDAO.search_by_name, keyword, limit)
+
+    @staticmethod
+    async def fuzzy_search_by_name(keyword, limit=20, min_similarity=0.3):
+        return await run_db(StudentDAO.fuzzy_search_by_name, keyword, limit, min_similarity)
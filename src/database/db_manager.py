@@ -1,98 +1,198 @@
 """Database connection manager"""
 import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
+from contextlib import contextmanager
 import sys
 import os
+import threading
+import time
 
 # Add config directory to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
-from config.database import DB_CONFIG
+from config.database import DB_CONFIG, DB_POOL_CONFIG
 
 
 class DBManager:
-    """Manages MySQL database connections"""
+    """
+    Manages MySQL database connections
     
-    def __init__(self):
-        self.connection = None
-        self.cursor = None
+    Dùng connection pool: mỗi thao tác mượn 1 connection + cursor riêng rồi trả lại pool,
+    nên các thread (GUI, tìm kiếm camera, batch) dùng chung db_manager được mà không
+    tranh nhau 1 cursor. Pool tự kiểm tra connection khi mượn ra, kết nối lại thất bại
+    (vd. MySQL đang khởi động lại) thì thử lại với backoff.
+    """
+    
+    def __init__(self, pool_size=None):
+        self.pool_size = min(pool_size or DB_POOL_CONFIG['pool_size'], pooling.CNX_POOL_MAXSIZE)
+        self.pool = None
+        self._pool_lock = threading.Lock()
     
     def connect(self):
-        """Establish database connection"""
-        try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
-            if self.connection.is_connected():
-                self.cursor = self.connection.cursor(dictionary=True)
+        """Tạo connection pool (thử lại với backoff nếu database chưa sẵn sàng)"""
+        with self._pool_lock:
+            if self.pool is not None:
                 return True
-        except Error as e:
-            print(f"Lỗi kết nối database: {e}")
+            
+            for attempt in range(DB_POOL_CONFIG['reconnect_attempts'] + 1):
+                try:
+                    self.pool = pooling.MySQLConnectionPool(
+                        pool_name=f"student_card_{os.getpid()}_{id(self)}",
+                        pool_size=self.pool_size,
+                        **DB_CONFIG
+                    )
+                    return True
+                except Error as e:
+                    print(f"Lỗi kết nối database: {e}")
+                    if attempt < DB_POOL_CONFIG['reconnect_attempts']:
+                        time.sleep(DB_POOL_CONFIG['reconnect_backoff'] * 2 ** attempt)
             return False
     
     def disconnect(self):
-        """Close database connection"""
-        if self.connection and self.connection.is_connected():
-            if self.cursor:
-                self.cursor.close()
-            self.connection.close()
+        """Close database connections"""
+        with self._pool_lock:
+            pool, self.pool = self.pool, None
+        if pool is None:
+            return
+        
+        # Chỉ đóng được các connection đang rảnh (lấy hết ra khỏi pool),
+        # connection đang mượn được trả về pool cũ và đóng khi pool bị thu hồi
+        while True:
+            try:
+                connection = pool.get_connection()
+            except Error:
+                break
+            try:
+                connection.disconnect()
+            except Error:
+                pass
+    
+    def _acquire(self):
+        """
+        Mượn 1 connection từ pool (chờ nếu pool đang dùng hết). Pool tự kiểm tra connection
+        rảnh còn sống và kết nối lại nếu server đã đóng (wait_timeout, restart MySQL, ...),
+        ở đây chỉ thử lại với backoff khi việc kết nối lại đó thất bại
+        """
+        pool = self.pool
+        if pool is None:
+            if not self.connect():
+                raise Error("Không thể kết nối đến database")
+            pool = self.pool
+        
+        deadline = time.monotonic() + DB_POOL_CONFIG['acquire_timeout']
+        attempt = 0
+        while True:
+            try:
+                return pool.get_connection()
+            except pooling.PoolError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.01)
+            except Error as e:
+                if attempt >= DB_POOL_CONFIG['reconnect_attempts']:
+                    raise
+                print(f"⚠ Mất kết nối database ({e}), thử lại...")
+                time.sleep(DB_POOL_CONFIG['reconnect_backoff'] * 2 ** attempt)
+                attempt += 1
+    
+    @contextmanager
+    def cursor(self, dictionary=True, buffered=True):
+        """
+        Mượn connection + cursor cho 1 thao tác, tự trả lại pool khi xong
+        
+        Usage:
+            with db_manager.cursor() as (connection, cursor):
+                cursor.execute(...)
+        """
+        connection = self._acquire()
+        try:
+            cursor = connection.cursor(dictionary=dictionary, buffered=buffered)
+        except Exception:
+            connection.close()  # trả lại pool
+            raise
+        try:
+            yield connection, cursor
+        finally:
+            # Dừng giữa chừng khi đọc cursor không buffer: đọc hết phần còn lại trước khi trả connection
+            if connection.unread_result:
+                connection.consume_results()
+            cursor.close()
+            connection.close()  # trả lại pool
+    
+    @contextmanager
+    def transaction(self):
+        """
+        Nhiều câu lệnh trong 1 transaction: commit khi xong, rollback nếu có exception
+        
+        Usage:
+            with db_manager.transaction() as cursor:
+                cursor.execute(...)
+                cursor.execute(...)
+        """
+        with self.cursor() as (connection, cursor):
+            try:
+                yield cursor
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
     
     def execute_query(self, query, params=None):
         """Execute SELECT query"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            
-            return self.cursor.fetchall()
+            with self.cursor() as (connection, cursor):
+                cursor.execute(query, params or ())
+                return cursor.fetchall()
         except Error as e:
             print(f"Lỗi thực thi query: {e}")
             return None
     
+    def stream_query(self, query, params=None, chunk_size=1000):
+        """
+        Execute SELECT query với cursor không buffer (server-side), trả về từng chunk
+        list tuple để không phải giữ toàn bộ kết quả trong RAM
+        
+        Yields:
+            list: tối đa chunk_size dòng (tuple theo thứ tự cột trong query)
+        """
+        try:
+            with self.cursor(dictionary=False, buffered=False) as (connection, cursor):
+                cursor.execute(query, params or ())
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+        except Error as e:
+            print(f"Lỗi thực thi query: {e}")
+            raise
+    
+    def _execute_write(self, query, params, result):
+        with self.transaction() as cursor:
+            cursor.execute(query, params or ())
+            return result(cursor)
+    
     def execute_update(self, query, params=None):
         """Execute INSERT/UPDATE/DELETE query"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            
-            self.connection.commit()
-            return self.cursor.rowcount
+            return self._execute_write(query, params, lambda cursor: cursor.rowcount)
         except Error as e:
-            if self.connection:
-                self.connection.rollback()
             print(f"Lỗi thực thi update: {e}")
             return 0
     
     def execute_insert(self, query, params=None):
         """Execute INSERT query and return last insert id"""
         try:
-            if not self.connection or not self.connection.is_connected():
-                self.connect()
-            
-            if params:
-                self.cursor.execute(query, params)
-            else:
-                self.cursor.execute(query)
-            
-            self.connection.commit()
-            return self.cursor.lastrowid
+            return self._execute_write(query, params, lambda cursor: cursor.lastrowid)
         except Error as e:
-            if self.connection:
-                self.connection.rollback()
             print(f"Lỗi thực thi insert: {e}")
             return None
     
     def get_connection(self):
-        """Get current connection"""
-        if not self.connection or not self.connection.is_connected():
-            self.connect()
-        return self.connection
+        """
+        Mượn 1 connection từ pool để tự quản lý transaction,
+        phải gọi connection.close() để trả lại pool
+        """
+        return self._acquire()
     
     def __enter__(self):
         """Context manager entry"""
@@ -106,4 +206,3 @@ class DBManager:
 
 # Global instance
 db_manager = DBManager()
-
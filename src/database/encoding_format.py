@@ -0,0 +1,99 @@
+"""
+Định dạng lưu face encoding trong cột students.face_encoding (BLOB):
+
+    1 byte version (0x01) + 128 x float32 little-endian = 513 bytes
+
+Dữ liệu cũ dạng pickle vẫn đọc được (chỉ cho phép các class của numpy) cho tới khi
+chạy migration: python -m src.database.migrate_encodings
+"""
+import io
+import pickle
+
+import numpy as np
+
+ENCODING_DIM = 128
+FORMAT_VERSION = 1
+ENCODING_DTYPE = np.dtype('<f4')
+ENCODED_SIZE = 1 + ENCODING_DIM * ENCODING_DTYPE.itemsize
+
+
+def encode(face_encoding):
+    """
+    Args:
+        face_encoding: numpy array (128,)
+
+    Returns:
+        bytes: 513 bytes
+    """
+    array = np.asarray(face_encoding, dtype=ENCODING_DTYPE).reshape(-1)
+    if array.shape != (ENCODING_DIM,):
+        raise ValueError(f"Face encoding phải có {ENCODING_DIM} chiều, nhận được {array.shape}")
+    return bytes([FORMAT_VERSION]) + array.tobytes()
+
+
+def is_current(blob):
+    """True nếu blob đã ở định dạng hiện tại (không cần migrate)"""
+    return blob is not None and len(blob) == ENCODED_SIZE and blob[0] == FORMAT_VERSION
+
+
+class _NumpyUnpickler(pickle.Unpickler):
+    """Chỉ cho phép dựng lại numpy array, chặn mọi class khác trong dữ liệu pickle"""
+
+    ALLOWED = {
+        ('numpy', 'ndarray'),
+        ('numpy', 'dtype'),
+        ('numpy.core.multiarray', '_reconstruct'),
+        ('numpy._core.multiarray', '_reconstruct'),
+        ('numpy.core.multiarray', 'scalar'),
+        ('numpy._core.multiarray', 'scalar'),
+    }
+
+    def find_class(self, module, name):
+        if (module, name) not in self.ALLOWED:
+            raise pickle.UnpicklingError(f"Không cho phép {module}.{name} trong face encoding")
+        return super().find_class(module, name)
+
+
+def _decode_legacy(blob):
+    array = _NumpyUnpickler(io.BytesIO(blob)).load()
+    return np.asarray(array, dtype=ENCODING_DTYPE).reshape(ENCODING_DIM)
+
+
+def decode(blob):
+    """
+    Args:
+        blob: bytes - định dạng hiện tại hoặc pickle cũ
+
+    Returns:
+        numpy array float32 (128,) hoặc None (blob None hoặc rỗng)
+    """
+    if not blob:
+        return None
+    if is_current(blob):
+        return np.frombuffer(blob, dtype=ENCODING_DTYPE, offset=1)
+    return _decode_legacy(bytes(blob))
+
+
+def decode_many(blobs):
+    """
+    Giải mã nhiều blob thành 1 ma trận: ghép buffer rồi np.frombuffer 1 lần,
+    chỉ các dòng pickle cũ (chưa migrate) mới phải giải mã riêng
+
+    Args:
+        blobs: list bytes (không có None)
+
+    Returns:
+        numpy array float32 (N, 128)
+    """
+    if not blobs:
+        return np.empty((0, ENCODING_DIM), dtype=ENCODING_DTYPE)
+
+    current = [is_current(blob) for blob in blobs]
+    if all(current):
+        raw = np.frombuffer(b''.join(blobs), dtype=np.uint8).reshape(len(blobs), ENCODED_SIZE)
+        return raw[:, 1:].copy().view(ENCODING_DTYPE)
+
+    matrix = np.empty((len(blobs), ENCODING_DIM), dtype=ENCODING_DTYPE)
+    for i, (blob, ok) in enumerate(zip(blobs, current)):
+        matrix[i] = np.frombuffer(blob, dtype=ENCODING_DTYPE, offset=1) if ok else _decode_legacy(bytes(blob))
+    return matrix
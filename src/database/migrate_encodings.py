@@ -0,0 +1,77 @@
+"""
+Chuyển face encoding dạng pickle cũ sang định dạng float32 nhị phân (xem encoding_format.py):
+
+    python -m src.database.migrate_encodings [--batch-size 500] [--dry-run]
+
+Chạy lại nhiều lần không sao, các dòng đã ở định dạng mới được bỏ qua.
+"""
+from .db_manager import db_manager
+from . import encoding_format
+
+
+def migrate_encodings(batch_size=500, dry_run=False):
+    """
+    Duyệt bảng students theo id (từng batch) và ghi lại các encoding chưa ở định dạng hiện tại
+
+    Returns:
+        dict: scanned, migrated, failed (list id không đọc được)
+    """
+    stats = {'scanned': 0, 'migrated': 0, 'failed': []}
+    last_id = 0
+
+    while True:
+        rows = db_manager.execute_query(
+            "SELECT id, face_encoding FROM students WHERE id > %s AND face_encoding IS NOT NULL ORDER BY id LIMIT %s",
+            (last_id, batch_size)
+        )
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        stats['scanned'] += len(rows)
+
+        for row in rows:
+            if encoding_format.is_current(row['face_encoding']):
+                continue
+            try:
+                blob = encoding_format.encode(encoding_format.decode(row['face_encoding']))
+            except Exception as e:
+                print(f"⚠ Không đọc được encoding của student {row['id']}: {e}")
+                stats['failed'].append(row['id'])
+                continue
+
+            if dry_run:
+                stats['migrated'] += 1
+                continue
+            # Chỉ ghi đè đúng blob vừa đọc: dòng bị xóa/ghi lại sau SELECT không bị tính là đã chuyển đổi
+            if db_manager.execute_update(
+                "UPDATE students SET face_encoding = %s WHERE id = %s AND face_encoding = %s",
+                (blob, row['id'], row['face_encoding'])
+            ):
+                stats['migrated'] += 1
+
+        print(f"  ... đã quét tới id {last_id}: {stats['migrated']} encoding cần chuyển đổi")
+
+    return stats
+
+
+def main():
+    """Migrate face encoding từ dòng lệnh"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Chuyển face encoding pickle sang float32 nhị phân")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--dry-run', action='store_true', help="Chỉ đếm, không ghi database")
+    args = parser.parse_args()
+
+    if not db_manager.connect():
+        raise SystemExit("Không thể kết nối đến database")
+
+    stats = migrate_encodings(args.batch_size, args.dry_run)
+    action = "cần chuyển đổi" if args.dry_run else "đã chuyển đổi"
+    print(f"✓ Đã quét {stats['scanned']} encoding, {stats['migrated']} {action}, {len(stats['failed'])} lỗi")
+    if stats['failed']:
+        print(f"⚠ Các student id lỗi: {stats['failed']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+"""
+Migration schema database theo version, các version đã chạy được lưu trong bảng schema_migrations:
+
+    python -m src.database.migrations             # áp dụng các migration còn thiếu
+    python -m src.database.migrations --status    # version hiện tại / các migration chưa chạy
+    python -m src.database.migrations --explain   # kiểm tra truy vấn của StudentDAO có dùng index
+
+Ứng dụng tự chạy migration ở thread nền khi khởi động (tắt bằng DB_AUTO_MIGRATE=0), các máy
+khởi động cùng lúc được xếp hàng bằng GET_LOCK('schema_migrations'). Mỗi migration kiểm tra
+cột/index/bảng đã có chưa trước khi tạo, nên database tạo từ database/schema.sql mới nhất,
+từ schema cũ, hay đã sửa tay bằng các câu ALTER trước đây đều migrate được.
+"""
+from .db_manager import db_manager
+
+
+def _table_exists(cursor, table):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+        (table,)
+    )
+    return bool(cursor.fetchall())
+
+
+def _column_exists(cursor, table, column):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME = %s",
+        (table, column)
+    )
+    return bool(cursor.fetchall())
+
+
+def _index_exists(cursor, table, index):
+    cursor.execute(
+        "SELECT 1 FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND INDEX_NAME = %s",
+        (table, index)
+    )
+    return bool(cursor.fetchall())
+
+
+def _alter_students(cursor, clauses):
+    """Gộp các thay đổi vào 1 câu ALTER TABLE (bảng chỉ bị dựng lại 1 lần)"""
+    if clauses:
+        cursor.execute(f"ALTER TABLE students {', '.join(clauses)}")
+
+
+def _add_updated_at(cursor):
+    """Cột updated_at cho face index đồng bộ sinh viên sửa từ máy khác"""
+    clauses = []
+    if not _column_exists(cursor, 'students', 'updated_at'):
+        clauses.append("ADD COLUMN updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")
+    if not _index_exists(cursor, 'students', 'idx_updated_at'):
+        clauses.append("ADD INDEX idx_updated_at (updated_at)")
+    _alter_students(cursor, clauses)
+
+
+def _add_name_tokens(cursor):
+    """Bảng token tên không dấu cho StudentDAO.search_by_name, index lại tên đã có"""
+    if _table_exists(cursor, 'student_name_tokens'):
+        return
+
+    cursor.execute("""
+        CREATE TABLE student_name_tokens (
+            token VARCHAR(50) CHARACTER SET ascii COLLATE ascii_bin NOT NULL,
+            student_id INT NOT NULL,
+            PRIMARY KEY (token, student_id),
+            INDEX idx_student_id (student_id),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+    """)
+
+    from .name_search import rebuild_name_tokens
+    rebuild_name_tokens()
+
+
+def _add_query_indexes(cursor):
+    """
+    Index theo các truy vấn của StudentDAO:
+    - has_encoding (cột sinh từ face_encoding IS NOT NULL, không index được BLOB) + updated_at:
+      COUNT/MAX(id)/MAX(updated_at) của face index sync và danh sách id chỉ đọc index
+    - created_at: get_all / get_page (keyset trên (created_at, id), InnoDB thêm id vào cuối index)
+    - ngay_het_han: get_expiring
+    - bỏ idx_mssv, trùng với index của UNIQUE(mssv)
+    """
+    clauses = []
+    if not _column_exists(cursor, 'students', 'has_encoding'):
+        clauses.append("ADD COLUMN has_encoding TINYINT(1) AS (face_encoding IS NOT NULL) VIRTUAL")
+    for name, columns in (('idx_has_encoding_updated', 'has_encoding, updated_at'),
+                          ('idx_created_at', 'created_at'),
+                          ('idx_ngay_het_han', 'ngay_het_han')):
+        if not _index_exists(cursor, 'students', name):
+            clauses.append(f"ADD INDEX {name} ({columns})")
+    if _index_exists(cursor, 'students', 'idx_mssv'):
+        clauses.append("DROP INDEX idx_mssv")
+    _alter_students(cursor, clauses)
+
+
+# (version, mô tả, hàm nhận cursor). Chỉ thêm vào cuối, không sửa/đánh số lại migration đã phát hành
+MIGRATIONS = [
+    (1, "students.updated_at", _add_updated_at),
+    (2, "student_name_tokens", _add_name_tokens),
+    (3, "index theo truy vấn StudentDAO, bỏ idx_mssv", _add_query_indexes),
+]
+
+
+def _applied_versions(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row['version'] for row in cursor.fetchall()}
+
+
+def pending_migrations():
+    """
+    Returns:
+        list: (version, mô tả) các migration chưa chạy
+    """
+    with db_manager.cursor() as (connection, cursor):
+        applied = _applied_versions(cursor)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+# Tên lock (GET_LOCK) để các máy khởi động cùng lúc không chạy cùng 1 migration
+MIGRATION_LOCK = 'schema_migrations'
+
+
+def migrate(lock_timeout=600):
+    """
+    Chạy lần lượt các migration chưa áp dụng (DDL của MySQL tự commit, nên mỗi migration
+    được ghi vào schema_migrations ngay sau khi chạy xong).
+
+    Giữ GET_LOCK(MIGRATION_LOCK) trong suốt quá trình: máy khởi động sau chờ máy trước
+    chạy xong rồi đọc lại các version đã áp dụng, không chạy lại migration đó.
+
+    Args:
+        lock_timeout: int - số giây tối đa chờ máy khác migrate xong
+
+    Returns:
+        list: version đã áp dụng trong lần gọi này
+    """
+    from .student_dao import StudentDAO
+
+    applied_now = []
+    with db_manager.cursor() as (connection, cursor):
+        cursor.execute("SELECT GET_LOCK(%s, %s) AS locked", (MIGRATION_LOCK, lock_timeout))
+        if not cursor.fetchall()[0]['locked']:
+            raise RuntimeError(f"Không lấy được lock {MIGRATION_LOCK} sau {lock_timeout}s (máy khác đang migrate?)")
+        try:
+            applied = _applied_versions(cursor)
+            for version, name, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                print(f"  ... migration {version}: {name}")
+                apply(cursor)
+                cursor.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                connection.commit()
+                applied_now.append(version)
+                # Dùng ngay bảng/cột vừa tạo, không chờ các migration sau (có thể chạy nhiều phút)
+                StudentDAO.reset_schema()
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s) AS released", (MIGRATION_LOCK,))
+            cursor.fetchall()
+
+    return applied_now
+
+
+def explain_dao_queries():
+    """
+    Chạy các method đọc của StudentDAO, EXPLAIN mọi câu SELECT chúng gửi đi và kiểm tra
+    không câu nào quét toàn bảng (type = ALL). Nên chạy trên database có dữ liệu thật:
+    với bảng vài dòng MySQL có thể chọn quét toàn bảng dù có index.
+
+    Returns:
+        list: dict method, query, plan (list dòng EXPLAIN), status ('ok' | 'warning' | 'full_scan')
+    """
+    from .student_dao import StudentDAO
+
+    sample = db_manager.execute_query(
+        "SELECT id, mssv, ho_ten, created_at, updated_at, ngay_het_han FROM students ORDER BY id DESC LIMIT 1"
+    )
+    sample = sample[0] if sample else {'id': 1, 'mssv': '0', 'ho_ten': 'a', 'created_at': '2000-01-01',
+                                       'updated_at': '2000-01-01', 'ngay_het_han': '2000-01-01'}
+
+    checks = [
+        ('get_by_id', lambda: StudentDAO.get_by_id(sample['id'])),
+        ('get_by_mssv', lambda: StudentDAO.get_by_mssv(sample['mssv'])),
+        ('get_by_ids', lambda: StudentDAO.get_by_ids([sample['id'], sample['id'] - 1])),
+        ('get_page', lambda: StudentDAO.get_page()),
+        ('get_page (trang sau)', lambda: StudentDAO.get_page((sample['created_at'], sample['id']))),
+        ('get_expiring', lambda: StudentDAO.get_expiring(sample['ngay_het_han'] or '2000-01-01')),
+        ('search_by_name', lambda: StudentDAO.search_by_name(sample['ho_ten'], limit=20)),
+        ('get_all_names', lambda: list(StudentDAO.get_all_names())),
+        ('get_encoding_sync_state', lambda: StudentDAO.get_encoding_sync_state()),
+        ('get_ids_with_encodings', lambda: StudentDAO.get_ids_with_encodings()),
+        ('load_encodings_changed_since',
+         lambda: StudentDAO.load_encodings_changed_since(sample['id'], sample['updated_at'])),
+    ]
+
+    # Các truy vấn kiểm tra schema chỉ chạy 1 lần, không tính vào kết quả
+    StudentDAO._encoding_filter()
+    StudentDAO._name_tokens_available()
+
+    results = []
+    current = {}
+    original_query = db_manager.execute_query
+    original_stream = db_manager.stream_query
+
+    def explain(query, params):
+        if query.lstrip().upper().startswith('SELECT'):
+            plan = original_query(f"EXPLAIN {query}", params) or []
+            scans = [row for row in plan if row.get('type') == 'ALL']
+            if not scans:
+                status = 'ok'
+            elif all(row.get('possible_keys') for row in scans):
+                status = 'warning'  # có index nhưng optimizer chọn quét bảng (thường do bảng nhỏ)
+            else:
+                status = 'full_scan'
+            results.append({'method': current['method'], 'query': ' '.join(query.split()),
+                            'plan': plan, 'status': status})
+
+    def execute_query(query, params=None):
+        explain(query, params)
+        return original_query(query, params)
+
+    def stream_query(query, params=None, chunk_size=1000):
+        explain(query, params)
+        return original_stream(query, params, chunk_size)
+
+    # Thay tạm thời trên instance, xóa đi thì dùng lại method của class
+    db_manager.execute_query = execute_query
+    db_manager.stream_query = stream_query
+    try:
+        for method, call in checks:
+            current['method'] = method
+            call()
+    finally:
+        del db_manager.execute_query
+        del db_manager.stream_query
+    return results
+
+
+def main():
+    """Chạy migration / kiểm tra index từ dòng lệnh"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Migration schema database")
+    parser.add_argument('--status', action='store_true', help="Chỉ hiển thị các migration chưa chạy")
+    parser.add_argument('--explain', action='store_true', help="EXPLAIN các truy vấn của StudentDAO")
+    args = parser.parse_args()
+
+    if not db_manager.connect():
+        raise SystemExit("Không thể kết nối đến database")
+
+    if args.status:
+        pending = pending_migrations()
+        print(f"Schema version mới nhất: {MIGRATIONS[-1][0]}, {len(pending)} migration chưa chạy")
+        for version, name in pending:
+            print(f"  {version}: {name}")
+    elif not args.explain:
+        applied = migrate()
+        print(f"✓ Đã áp dụng {len(applied)} migration" + (f": {applied}" if applied else ""))
+
+    if args.explain:
+        results = explain_dao_queries()
+        icons = {'ok': '✓', 'warning': '⚠', 'full_scan': '✗'}
+        for result in results:
+            keys = ', '.join(f"{row.get('table')}:{row.get('type')}/{row.get('key')}" for row in result['plan'])
+            print(f"{icons[result['status']]} {result['method']:<30} {keys}")
+            if result['status'] != 'ok':
+                print(f"    {result['query']}")
+        if any(result['status'] == 'full_scan' for result in results):
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
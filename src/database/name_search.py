@@ -0,0 +1,264 @@
+"""
+Tìm kiếm sinh viên theo tên, không phân biệt dấu:
+
+- normalize_name / name_tokens: "Nguyễn Văn Đức" -> ['nguyen', 'van', 'duc']
+- Bảng student_name_tokens (token, student_id): StudentDAO.search_by_name tra từng token
+  theo prefix trên primary key thay vì LIKE '%...%' quét toàn bảng
+- NameTrigramIndex: index trigram trong RAM cho tên gõ sai / OCR sai (fuzzy_search_by_name)
+
+Tạo lại bảng token cho dữ liệu cũ (database tạo trước khi có bảng student_name_tokens):
+
+    python -m src.database.name_search --rebuild
+"""
+import re
+import threading
+import unicodedata
+from array import array
+
+import numpy as np
+
+_NON_ALNUM = re.compile(r'[^0-9a-z]+')
+
+# Độ dài tối đa của 1 token (cột student_name_tokens.token)
+MAX_TOKEN_LENGTH = 50
+
+
+def normalize_name(text):
+    """
+    Bỏ dấu tiếng Việt, chữ thường, chỉ giữ chữ/số cách nhau 1 khoảng trắng
+
+    Args:
+        text: str
+
+    Returns:
+        str: vd. "Nguyễn Văn  Đức" -> "nguyen van duc"
+    """
+    if not text:
+        return ''
+    # đ/Đ không tách được thành d + dấu bằng NFD
+    text = text.replace('đ', 'd').replace('Đ', 'D')
+    text = ''.join(ch for ch in unicodedata.normalize('NFD', text) if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(' ', text.lower()).strip()
+
+
+def name_tokens(text):
+    """Các token (không trùng, giữ thứ tự) của tên đã chuẩn hóa"""
+    tokens = []
+    for token in normalize_name(text).split():
+        token = token[:MAX_TOKEN_LENGTH]
+        if token not in tokens:
+            tokens.append(token)
+    return tokens
+
+
+def trigrams(text):
+    """
+    Tập trigram của tên đã chuẩn hóa, mỗi từ được đệm 2 khoảng trắng phía trước
+    và 1 phía sau (như pg_trgm) để từ ngắn như "le", "an" vẫn có trigram
+    """
+    grams = set()
+    for token in normalize_name(text).split():
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameTrigramIndex:
+    """
+    Inverted index trigram -> các slot, mỗi slot là 1 sinh viên. Tìm kiếm đếm số trigram
+    chung bằng np.bincount rồi xếp hạng theo độ tương đồng Jaccard.
+
+    Sửa/xóa không dời dữ liệu: slot cũ bị đánh dấu không còn dùng, sửa thì thêm slot mới.
+    """
+
+    def __init__(self, students=()):
+        """
+        Args:
+            students: iterable (student_id, ho_ten)
+        """
+        self._lock = threading.Lock()
+        self._postings = {}                 # trigram -> array('i') slot
+        self._slot_ids = array('q')         # slot -> student_id
+        self._slot_sizes = array('i')       # slot -> số trigram của tên
+        self._alive = array('b')            # slot -> 1 nếu còn dùng
+        self._slots = {}                    # student_id -> slot hiện tại
+        for student_id, ho_ten in students:
+            self._add(student_id, ho_ten)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _add(self, student_id, ho_ten):
+        old = self._slots.pop(student_id, None)
+        if old is not None:
+            self._alive[old] = 0
+
+        grams = trigrams(ho_ten)
+        if not grams:
+            return
+
+        slot = len(self._slot_ids)
+        self._slot_ids.append(student_id)
+        self._slot_sizes.append(len(grams))
+        self._alive.append(1)
+        self._slots[student_id] = slot
+        for gram in grams:
+            postings = self._postings.get(gram)
+            if postings is None:
+                postings = self._postings[gram] = array('i')
+            postings.append(slot)
+
+    def upsert(self, student_id, ho_ten):
+        """Thêm hoặc cập nhật tên của 1 sinh viên"""
+        with self._lock:
+            self._add(student_id, ho_ten)
+
+    def remove(self, student_id):
+        """Xóa 1 sinh viên khỏi index (không có thì bỏ qua)"""
+        with self._lock:
+            slot = self._slots.pop(student_id, None)
+            if slot is not None:
+                self._alive[slot] = 0
+
+    def search(self, keyword, limit=20, min_similarity=0.3):
+        """
+        Args:
+            keyword: str - tên cần tìm (có dấu hoặc không, có thể sai vài ký tự)
+            limit: int - số kết quả tối đa
+            min_similarity: float - ngưỡng Jaccard trên tập trigram (0-1)
+
+        Returns:
+            list: (student_id, similarity) sắp xếp theo similarity giảm dần
+        """
+        query = trigrams(keyword)
+        if not query:
+            return []
+
+        with self._lock:
+            postings = [self._postings[gram] for gram in query if gram in self._postings]
+            if not postings:
+                return []
+            # np.frombuffer không copy; các view phải được giải phóng trước khi nhả lock
+            # (array đang bị view thì không append được)
+            counts = np.bincount(np.concatenate([np.frombuffer(p, dtype=np.int32) for p in postings]),
+                                 minlength=len(self._slot_ids))
+            counts *= np.frombuffer(self._alive, dtype=np.int8)
+            candidates = np.flatnonzero(counts)
+            shared = counts[candidates]
+            similarity = shared / (len(query) + np.frombuffer(self._slot_sizes, dtype=np.int32)[candidates] - shared)
+            student_ids = np.frombuffer(self._slot_ids, dtype=np.int64)[candidates]
+
+        keep = similarity >= min_similarity
+        student_ids, similarity = student_ids[keep], similarity[keep]
+        if len(student_ids) > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            student_ids, similarity = student_ids[top], similarity[top]
+        order = np.argsort(-similarity, kind='stable')
+        return [(int(student_ids[i]), float(similarity[i])) for i in order]
+
+
+_NAME_INDEX = None
+_NAME_INDEX_LOCK = threading.Lock()
+
+
+def _on_student_write(action, student_id, student_data):
+    """Áp dụng thay đổi tên từ StudentDAO vào index (nếu index đã được load)"""
+    index = _NAME_INDEX
+    if index is None:
+        return
+
+    if action == 'delete':
+        index.remove(student_id)
+    elif student_data.get('ho_ten'):
+        index.upsert(student_id, student_data['ho_ten'])
+
+
+def get_name_index():
+    """
+    Index trigram dùng chung (load toàn bộ id, ho_ten ở lần gọi đầu, sau đó cập nhật
+    theo các lần ghi qua StudentDAO của process này)
+    """
+    global _NAME_INDEX
+    from .student_dao import StudentDAO, add_write_listener
+
+    with _NAME_INDEX_LOCK:
+        if _NAME_INDEX is None:
+            _NAME_INDEX = NameTrigramIndex(StudentDAO.get_all_names())
+            add_write_listener(_on_student_write)
+            print(f"✓ Name index: {len(_NAME_INDEX)} sinh viên")
+        return _NAME_INDEX
+
+
+def invalidate_name_index():
+    """Bỏ index hiện tại, lần tìm kiếm sau sẽ load lại từ database"""
+    global _NAME_INDEX
+    with _NAME_INDEX_LOCK:
+        _NAME_INDEX = None
+
+
+def rebuild_name_tokens(batch_size=1000):
+    """
+    Tạo lại toàn bộ bảng student_name_tokens từ cột ho_ten (duyệt theo id từng batch)
+
+    Returns:
+        int: số sinh viên đã index
+    """
+    from .db_manager import db_manager
+    from .student_dao import StudentDAO
+
+    total = 0
+    last_id = 0
+    while True:
+        with db_manager.transaction() as cursor:
+            # Khóa batch đang index: tên được sửa cùng lúc (ghi token riêng) không bị ghi đè bằng tên cũ
+            cursor.execute(
+                "SELECT id, ho_ten FROM students WHERE id > %s ORDER BY id LIMIT %s FOR UPDATE", (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            StudentDAO._write_name_tokens(cursor, [(row['id'], row['ho_ten']) for row in rows])
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        total += len(rows)
+        print(f"  ... đã index tới id {last_id} ({total} sinh viên)")
+    return total
+
+
+def main():
+    """Tạo lại bảng token / đo thời gian tìm kiếm theo tên từ dòng lệnh"""
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Index tìm kiếm sinh viên theo tên")
+    parser.add_argument('--rebuild', action='store_true', help="Tạo lại bảng student_name_tokens từ ho_ten")
+    parser.add_argument('--search', help="Tìm thử 1 tên (SQL theo token và trigram trong RAM)")
+    args = parser.parse_args()
+
+    from .db_manager import db_manager
+    from .student_dao import StudentDAO
+
+    if not db_manager.connect():
+        raise SystemExit("Không thể kết nối đến database")
+
+    if args.rebuild:
+        print(f"✓ Đã index tên của {rebuild_name_tokens()} sinh viên")
+
+    if args.search:
+        start = time.perf_counter()
+        results = StudentDAO.search_by_name(args.search)
+        print(f"search_by_name: {len(results)} kết quả, {(time.perf_counter() - start) * 1000:.1f} ms")
+        for student in results[:10]:
+            print(f"  {student['mssv']}  {student['ho_ten']}")
+
+        index = get_name_index()
+        start = time.perf_counter()
+        matches = index.search(args.search)
+        print(f"trigram: {len(matches)} kết quả, {(time.perf_counter() - start) * 1000:.1f} ms")
+        students = StudentDAO.get_by_ids([student_id for student_id, _ in matches[:10]])
+        for student_id, similarity in matches[:10]:
+            if student_id in students:
+                print(f"  {similarity:.2f}  {students[student_id]['mssv']}  {students[student_id]['ho_ten']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,154 @@
 """Data Access Object for Student operations"""
-import pickle
 import numpy as np
+import os
+import sys
+import time
 from datetime import datetime
+from mysql.connector import Error, errorcode
 from .db_manager import db_manager
+from . import encoding_format
+from .name_search import name_tokens
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.database import DB_SCHEMA_CHECK_INTERVAL
+
+# Các hàm được gọi sau mỗi lần ghi thành công: listener(action, student_id, student_data)
+# action: 'create' | 'update' | 'delete' (student_data = None khi delete)
+_write_listeners = []
+
+
+def add_write_listener(listener):
+    """Đăng ký listener nhận thay đổi của bảng students (vd. face index trong RAM)"""
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def _notify(action, student_id, student_data=None):
+    for listener in list(_write_listeners):
+        try:
+            listener(action, student_id, student_data)
+        except Exception as e:
+            print(f"⚠ Lỗi listener ({action} student {student_id}): {e}")
 
 
 class StudentDAO:
     """DAO for student CRUD operations"""
     
+    # Schema database, đọc từ information_schema (xem _detect_schema). None: chưa kiểm tra
+    # được (lỗi kết nối, ...), các truy vấn dùng cách chậm/an toàn và kiểm tra lại ở lần sau
+    _has_updated_at = None          # cột updated_at (đồng bộ face index sinh viên sửa từ máy khác)
+    _has_name_tokens = None         # bảng student_name_tokens (tìm theo tên không dấu)
+    _has_encoding_column = None     # cột has_encoding (migration 3)
+    _schema_checked_at = 0.0        # time.monotonic() của lần kiểm tra thành công gần nhất
+    
+    @staticmethod
+    def _detect_schema():
+        """
+        Kiểm tra schema qua information_schema. Chỉ ghi nhớ khi truy vấn thành công:
+        lỗi tạm thời (mất kết nối, lock/pool timeout) không làm process bị hạ cấp vĩnh viễn.
+        Khi còn thiếu cột/bảng, kiểm tra lại sau DB_SCHEMA_CHECK_INTERVAL giây để thấy
+        migration chạy từ máy khác; schema đã đủ thì không kiểm tra nữa
+        
+        Returns:
+            bool: đã biết schema
+        """
+        known = StudentDAO._has_updated_at is not None
+        if known:
+            complete = (StudentDAO._has_updated_at and StudentDAO._has_name_tokens
+                        and StudentDAO._has_encoding_column)
+            if complete or time.monotonic() - StudentDAO._schema_checked_at < DB_SCHEMA_CHECK_INTERVAL:
+                return True
+        
+        try:
+            with db_manager.cursor() as (connection, cursor):
+                cursor.execute(
+                    "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'students' "
+                    "AND COLUMN_NAME IN ('updated_at', 'has_encoding')"
+                )
+                columns = {row['name'] for row in cursor.fetchall()}
+                cursor.execute(
+                    "SELECT 1 FROM information_schema.TABLES "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'student_name_tokens'"
+                )
+                has_name_tokens = bool(cursor.fetchall())
+        except Error as e:
+            print(f"⚠ Không kiểm tra được schema database ({e}), sẽ thử lại")
+            # Đã biết schema từ lần trước: dùng tiếp (schema chỉ được thêm, không bị bớt)
+            StudentDAO._schema_checked_at = time.monotonic()
+            return known
+        
+        if not known:
+            if 'updated_at' not in columns:
+                print("⚠ Bảng students chưa có cột updated_at, chỉ đồng bộ được sinh viên mới/bị xóa")
+            if 'has_encoding' not in columns:
+                print("⚠ Bảng students chưa có cột has_encoding, chạy: python -m src.database.migrations")
+            if not has_name_tokens:
+                print("⚠ Chưa có bảng student_name_tokens, tìm kiếm theo tên dùng LIKE (chậm, phân biệt dấu)")
+        
+        StudentDAO._schema_checked_at = time.monotonic()
+        StudentDAO._has_encoding_column = 'has_encoding' in columns
+        StudentDAO._has_name_tokens = has_name_tokens
+        StudentDAO._has_updated_at = 'updated_at' in columns  # gán cuối: đánh dấu đã kiểm tra xong
+        return True
+    
+    @staticmethod
+    def reset_schema():
+        """Kiểm tra lại schema ở truy vấn sau (vd. sau khi chạy migration)"""
+        StudentDAO._has_updated_at = None
+        StudentDAO._has_name_tokens = None
+        StudentDAO._has_encoding_column = None
+    
+    @staticmethod
+    def _encoding_filter():
+        """
+        Điều kiện lọc sinh viên có face encoding: cột sinh has_encoding (có index
+        idx_has_encoding_updated) nếu database đã migrate, không thì face_encoding IS NOT NULL
+        """
+        StudentDAO._detect_schema()
+        return "has_encoding = 1" if StudentDAO._has_encoding_column else "face_encoding IS NOT NULL"
+    
+    @staticmethod
+    def _name_tokens_available():
+        """Bảng student_name_tokens (tìm kiếm theo tên không dấu) đã được tạo chưa"""
+        if not StudentDAO._detect_schema():
+            return False
+        return StudentDAO._has_name_tokens
+    
+    @staticmethod
+    def _write_name_tokens(cursor, students):
+        """
+        Ghi lại các token tên (trong transaction của cursor). Luôn ghi nếu bảng đã có, không dựa
+        vào schema đã kiểm tra: migration 2 có thể vừa tạo bảng (ở máy này hoặc máy khác), bỏ qua
+        thì sinh viên đó không bao giờ tìm được theo tên
+        
+        Args:
+            cursor: cursor của transaction đang mở
+            students: list (student_id, ho_ten)
+        """
+        if not students:
+            return
+        
+        ids = [student_id for student_id, _ in students]
+        try:
+            cursor.execute(
+                f"DELETE FROM student_name_tokens WHERE student_id IN ({', '.join(['%s'] * len(ids))})", tuple(ids)
+            )
+        except Error as e:
+            # Chưa chạy migration 2: bỏ qua (lỗi chỉ hủy câu lệnh này, transaction vẫn tiếp tục),
+            # migration sẽ index lại toàn bộ tên khi tạo bảng
+            if e.errno == errorcode.ER_NO_SUCH_TABLE:
+                return
+            raise
+        
+        rows = [(token, student_id) for student_id, ho_ten in students for token in name_tokens(ho_ten)]
+        if rows:
+            cursor.execute(
+                f"INSERT INTO student_name_tokens (token, student_id) VALUES {', '.join(['(%s, %s)'] * len(rows))}",
+                tuple(value for row in rows for value in row)
+            )
+    
     @staticmethod
     def create(student_data):
         """
@@ -28,7 +169,7 @@ class StudentDAO:
         # Serialize face encoding
         face_encoding_bytes = None
         if student_data.get('face_encoding') is not None:
-            face_encoding_bytes = pickle.dumps(student_data['face_encoding'])
+            face_encoding_bytes = encoding_format.encode(student_data['face_encoding'])
         
         params = (
             student_data.get('mssv'),
@@ -40,7 +181,18 @@ class StudentDAO:
             face_encoding_bytes
         )
         
-        return db_manager.execute_insert(query, params)
+        try:
+            with db_manager.transaction() as cursor:
+                cursor.execute(query, params)
+                student_id = cursor.lastrowid
+                StudentDAO._write_name_tokens(cursor, [(student_id, student_data.get('ho_ten'))])
+        except Error as e:
+            print(f"Lỗi thực thi insert: {e}")
+            return None
+        
+        if student_id:
+            _notify('create', student_id, student_data)
+        return student_id
     
     @staticmethod
     def get_by_id(student_id):
@@ -59,8 +211,7 @@ class StudentDAO:
         if results and len(results) > 0:
             student = results[0]
             # Deserialize face encoding
-            if student['face_encoding']:
-                student['face_encoding'] = pickle.loads(student['face_encoding'])
+            student['face_encoding'] = encoding_format.decode(student['face_encoding'])
             return student
         return None
     
@@ -81,8 +232,7 @@ class StudentDAO:
         if results and len(results) > 0:
             student = results[0]
             # Deserialize face encoding
-            if student['face_encoding']:
-                student['face_encoding'] = pickle.loads(student['face_encoding'])
+            student['face_encoding'] = encoding_format.decode(student['face_encoding'])
             return student
         return None
     
@@ -98,6 +248,68 @@ class StudentDAO:
         results = db_manager.execute_query(query)
         return results or []
     
+    @staticmethod
+    def get_page(after=None, page_size=200):
+        """
+        1 trang sinh viên (mới nhất trước, cùng thứ tự với get_all) bằng keyset pagination
+        trên (created_at, id): mỗi trang là 1 range scan trên idx_created_at, không dùng OFFSET
+        
+        Args:
+            after: tuple (created_at, id) - cursor trả về từ trang trước, None cho trang đầu
+            page_size: int
+        
+        Returns:
+            tuple: (list student dicts, cursor trang sau hoặc None nếu đã hết)
+        """
+        columns = "id, mssv, ho_ten, ngay_sinh, nien_khoa, ngay_het_han, avatar_path, created_at"
+        if after is None:
+            query = f"SELECT {columns} FROM students ORDER BY created_at DESC, id DESC LIMIT %s"
+            params = (page_size,)
+        else:
+            created_at, last_id = after
+            query = (f"SELECT {columns} FROM students "
+                     "WHERE created_at < %s OR (created_at = %s AND id < %s) "
+                     "ORDER BY created_at DESC, id DESC LIMIT %s")
+            params = (created_at, created_at, last_id, page_size)
+        
+        results = db_manager.execute_query(query, params)
+        if results is None:
+            raise RuntimeError("Không thể tải danh sách sinh viên")
+        
+        next_cursor = None
+        if len(results) == page_size:
+            next_cursor = (results[-1]['created_at'], results[-1]['id'])
+        return results, next_cursor
+    
+    @staticmethod
+    def get_expiring(before, after=None):
+        """
+        Sinh viên có thẻ hết hạn trước ngày before (và từ ngày after nếu có), hết hạn sớm nhất trước
+        
+        Args:
+            before: date / 'YYYY-MM-DD'
+            after: date / 'YYYY-MM-DD' hoặc None
+        
+        Returns:
+            list: List of student dicts
+        """
+        query = "SELECT id, mssv, ho_ten, ngay_sinh, nien_khoa, ngay_het_han, avatar_path, created_at FROM students WHERE ngay_het_han < %s"
+        params = [before]
+        if after is not None:
+            query += " AND ngay_het_han >= %s"
+            params.append(after)
+        query += " ORDER BY ngay_het_han"
+        results = db_manager.execute_query(query, tuple(params))
+        return results or []
+    
+    @staticmethod
+    def _decode_encodings(students):
+        """Giải mã face_encoding của nhiều dòng cùng lúc (1 lần np.frombuffer cho cả danh sách)"""
+        rows = [student for student in students if student.get('face_encoding')]
+        matrix = encoding_format.decode_many([student['face_encoding'] for student in rows])
+        for student, encoding in zip(rows, matrix):
+            student['face_encoding'] = encoding
+    
     @staticmethod
     def get_all_with_encodings():
         """
@@ -106,15 +318,124 @@ class StudentDAO:
         Returns:
             list: List of student dicts with face_encoding
         """
-        query = "SELECT * FROM students WHERE face_encoding IS NOT NULL"
+        query = f"SELECT * FROM students WHERE {StudentDAO._encoding_filter()}"
+        results = db_manager.execute_query(query) or []
+        StudentDAO._decode_encodings(results)
+        return results
+    
+    @staticmethod
+    def get_encoding_sync_state():
+        """
+        Trạng thái các sinh viên có face encoding, dùng để phát hiện thay đổi từ máy khác
+        
+        Returns:
+            dict: total, max_id, updated_at (None nếu bảng chưa có cột updated_at) hoặc None nếu lỗi
+        """
+        if not StudentDAO._detect_schema():
+            return None
+        
+        # Database tạo từ schema cũ (chưa có updated_at): chỉ theo dõi được MAX(id) và COUNT(*)
+        updated_at = "MAX(updated_at)" if StudentDAO._has_updated_at else "NULL"
+        query = (f"SELECT COUNT(*) AS total, MAX(id) AS max_id, {updated_at} AS updated_at "
+                 f"FROM students WHERE {StudentDAO._encoding_filter()}")
         results = db_manager.execute_query(query)
+        return results[0] if results else None
+    
+    @staticmethod
+    def _load_encoding_matrix(condition='', params=(), chunk_size=5000):
+        """
+        Đọc (id, face_encoding) theo từng chunk bằng cursor không buffer và giải mã thẳng vào
+        1 ma trận cấp phát sẵn theo COUNT(*), không tạo dict cho từng dòng
+        
+        Returns:
+            tuple: (ids: numpy array int64 (N,), encodings: numpy array float32 (N, 128))
+        """
+        where = f"WHERE {StudentDAO._encoding_filter()} {condition}"
+        total = db_manager.execute_query(f"SELECT COUNT(*) AS total FROM students {where}", params or None)
+        capacity = total[0]['total'] if total else 0
         
-        if results:
-            for student in results:
-                if student['face_encoding']:
-                    student['face_encoding'] = pickle.loads(student['face_encoding'])
-            return results
-        return []
+        ids = np.empty(capacity, dtype=np.int64)
+        encodings = np.empty((capacity, encoding_format.ENCODING_DIM), dtype=encoding_format.ENCODING_DTYPE)
+        size = 0
+        
+        for rows in db_manager.stream_query(f"SELECT id, face_encoding FROM students {where}", params, chunk_size):
+            end = size + len(rows)
+            if end > capacity:
+                # Có sinh viên được thêm sau khi COUNT(*)
+                capacity = max(end, capacity * 2)
+                ids = np.resize(ids, capacity)
+                encodings = np.resize(encodings, (capacity, encoding_format.ENCODING_DIM))
+            
+            ids[size:end] = [row[0] for row in rows]
+            encodings[size:end] = encoding_format.decode_many([row[1] for row in rows])
+            size = end
+        
+        if size < capacity:
+            return ids[:size].copy(), encodings[:size].copy()
+        return ids, encodings
+    
+    @staticmethod
+    def load_encodings(chunk_size=5000):
+        """
+        Load toàn bộ face encoding (chỉ cột id, face_encoding) cho face index
+        
+        Returns:
+            tuple: (ids: numpy array int64 (N,), encodings: numpy array float32 (N, 128))
+        """
+        return StudentDAO._load_encoding_matrix(chunk_size=chunk_size)
+    
+    @staticmethod
+    def load_encodings_changed_since(min_id, updated_since=None):
+        """
+        Như load_encodings, chỉ lấy sinh viên có id > min_id hoặc updated_at >= updated_since
+        """
+        if updated_since is not None and StudentDAO._has_updated_at:
+            return StudentDAO._load_encoding_matrix("AND (id > %s OR updated_at >= %s)", (min_id or 0, updated_since))
+        return StudentDAO._load_encoding_matrix("AND id > %s", (min_id or 0,))
+    
+    @staticmethod
+    def load_encodings_by_ids(student_ids, batch_size=1000):
+        """
+        Như load_encodings, chỉ lấy các sinh viên trong student_ids (IN theo từng batch)
+        """
+        student_ids = list(student_ids)
+        parts = []
+        for i in range(0, len(student_ids), batch_size):
+            batch = student_ids[i:i + batch_size]
+            placeholders = ', '.join(['%s'] * len(batch))
+            parts.append(StudentDAO._load_encoding_matrix(f"AND id IN ({placeholders})", tuple(batch)))
+        if not parts:
+            return (np.zeros(0, dtype=np.int64),
+                    np.zeros((0, encoding_format.ENCODING_DIM), dtype=encoding_format.ENCODING_DTYPE))
+        return np.concatenate([ids for ids, _ in parts]), np.concatenate([encodings for _, encodings in parts])
+    
+    @staticmethod
+    def get_by_ids(student_ids):
+        """
+        Get nhiều students theo ID (không kèm face_encoding)
+        
+        Args:
+            student_ids: list int
+        
+        Returns:
+            dict: id -> student dict
+        """
+        if not student_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(student_ids))
+        query = f"SELECT id, mssv, ho_ten, ngay_sinh, nien_khoa, ngay_het_han, avatar_path, created_at FROM students WHERE id IN ({placeholders})"
+        results = db_manager.execute_query(query, tuple(student_ids))
+        return {student['id']: student for student in results or []}
+    
+    @staticmethod
+    def get_ids_with_encodings():
+        """
+        Returns:
+            set: ID của các sinh viên có face encoding
+        """
+        results = db_manager.execute_query(f"SELECT id FROM students WHERE {StudentDAO._encoding_filter()}")
+        return {row['id'] for row in results or []}
     
     @staticmethod
     def update(student_id, student_data):
@@ -141,7 +462,7 @@ class StudentDAO:
             fields.append("face_encoding = %s")
             face_encoding_bytes = None
             if student_data['face_encoding'] is not None:
-                face_encoding_bytes = pickle.dumps(student_data['face_encoding'])
+                face_encoding_bytes = encoding_format.encode(student_data['face_encoding'])
             params.append(face_encoding_bytes)
         
         if not fields:
@@ -150,7 +471,114 @@ class StudentDAO:
         params.append(student_id)
         query = f"UPDATE students SET {', '.join(fields)} WHERE id = %s"
         
-        return db_manager.execute_update(query, tuple(params))
+        try:
+            with db_manager.transaction() as cursor:
+                cursor.execute(query, tuple(params))
+                rowcount = cursor.rowcount
+                if rowcount and student_data.get('ho_ten'):
+                    StudentDAO._write_name_tokens(cursor, [(student_id, student_data['ho_ten'])])
+        except Error as e:
+            print(f"Lỗi thực thi update: {e}")
+            return 0
+        
+        if rowcount:
+            _notify('update', student_id, student_data)
+        return rowcount
+    
+    _UPSERT_COLUMNS = ('mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han', 'avatar_path', 'face_encoding')
+    
+    @staticmethod
+    def upsert_many(students, update_existing=True, chunk_size=500):
+        """
+        Insert/update nhiều students theo MSSV: mỗi chunk là 1 transaction gồm
+        SELECT id cũ + 1 câu INSERT nhiều dòng ... ON DUPLICATE KEY UPDATE + SELECT id mới,
+        thay cho get_by_mssv rồi create/update từng sinh viên
+        
+        Args:
+            students: list dict (bắt buộc có mssv), các keys như create. Trường thiếu hoặc None
+                      giữ nguyên giá trị cũ khi MSSV đã tồn tại
+            update_existing: bool - False thì bỏ qua MSSV đã có (status 'exists')
+            chunk_size: int - số dòng mỗi câu INSERT
+        
+        Returns:
+            list: dict mssv, id, status ('created' | 'updated' | 'exists' | 'error', kèm error)
+                  theo đúng thứ tự students
+        """
+        columns = StudentDAO._UPSERT_COLUMNS
+        if update_existing:
+            # VALUES(col) thay vì alias "AS new" để chạy được cả MySQL < 8.0.19 và MariaDB
+            assignments = ', '.join(f"{col} = COALESCE(VALUES({col}), {col})" for col in columns[1:])
+        else:
+            assignments = "id = id"
+        row_placeholder = f"({', '.join(['%s'] * len(columns))})"
+        
+        results = []
+        for start in range(0, len(students), chunk_size):
+            chunk = students[start:start + chunk_size]
+            mssvs = [student['mssv'] for student in chunk]
+            in_clause = ', '.join(['%s'] * len(set(mssvs)))
+        
+            try:
+                params = []
+                for student in chunk:
+                    for col in columns:
+                        value = student.get(col)
+                        if col == 'face_encoding' and value is not None:
+                            value = encoding_format.encode(value)
+                        params.append(value)
+        
+                with db_manager.transaction() as cursor:
+                    # Khóa các dòng đã có để phân biệt created/updated đúng trong transaction
+                    cursor.execute(f"SELECT id, mssv FROM students WHERE mssv IN ({in_clause}) FOR UPDATE",
+                                   tuple(set(mssvs)))
+                    existing = {row['mssv']: row['id'] for row in cursor.fetchall()}
+                    
+                    # Tự ghép VALUES nhiều dòng: 1 round trip cho cả chunk
+                    cursor.execute(
+                        f"INSERT INTO students ({', '.join(columns)}) "
+                        f"VALUES {', '.join([row_placeholder] * len(chunk))} "
+                        f"ON DUPLICATE KEY UPDATE {assignments}",
+                        tuple(params)
+                    )
+                    
+                    ids = dict(existing)
+                    if len(existing) < len(set(mssvs)):
+                        new_mssvs = tuple(mssv for mssv in set(mssvs) if mssv not in existing)
+                        cursor.execute(
+                            f"SELECT id, mssv FROM students WHERE mssv IN ({', '.join(['%s'] * len(new_mssvs))})",
+                            new_mssvs
+                        )
+                        ids.update((row['mssv'], row['id']) for row in cursor.fetchall())
+                    
+                    # Tên được ghi: dòng sau ghi đè dòng trước, trừ khi không update_existing
+                    names = {}
+                    for student in chunk:
+                        student_id = ids.get(student['mssv'])
+                        if not student.get('ho_ten') or student_id is None:
+                            continue
+                        if not update_existing and (student['mssv'] in existing or student_id in names):
+                            continue
+                        names[student_id] = student['ho_ten']
+                    StudentDAO._write_name_tokens(cursor, list(names.items()))
+            except Exception as e:
+                print(f"Lỗi upsert {len(chunk)} sinh viên: {e}")
+                results.extend({'mssv': mssv, 'id': None, 'status': 'error', 'error': str(e)} for mssv in mssvs)
+                continue
+        
+            seen = set()
+            for student, mssv in zip(chunk, mssvs):
+                if mssv in existing or mssv in seen:
+                    status = 'updated' if update_existing else 'exists'
+                else:
+                    status = 'created'
+                seen.add(mssv)
+                results.append({'mssv': mssv, 'id': ids.get(mssv), 'status': status})
+        
+                if status != 'exists':
+                    _notify('create' if status == 'created' else 'update', ids.get(mssv),
+                            {key: value for key, value in student.items() if value is not None})
+        
+        return results
     
     @staticmethod
     def delete(student_id):
@@ -164,20 +592,79 @@ class StudentDAO:
             int: Số rows được delete
         """
         query = "DELETE FROM students WHERE id = %s"
-        return db_manager.execute_update(query, (student_id,))
+        rowcount = db_manager.execute_update(query, (student_id,))
+        if rowcount:
+            _notify('delete', student_id)
+        return rowcount
+    
+    @staticmethod
+    def get_all_names(chunk_size=5000):
+        """
+        Yields:
+            tuple: (id, ho_ten) của mọi sinh viên (đọc theo chunk, dùng cho name index trong RAM)
+        """
+        for rows in db_manager.stream_query("SELECT id, ho_ten FROM students", chunk_size=chunk_size):
+            yield from rows
     
     @staticmethod
-    def search_by_name(keyword):
+    def search_by_name(keyword, limit=None):
         """
         Search students by name
         
+        Không phân biệt dấu, mỗi từ trong keyword khớp với đầu 1 từ trong tên
+        (vd. "nguyen va" khớp "Nguyễn Văn An"), tra theo index của bảng student_name_tokens
+        
         Args:
             keyword: string
+            limit: int - số kết quả tối đa (None: tất cả)
         
         Returns:
             list: List of matching students
         """
-        query = "SELECT id, mssv, ho_ten, ngay_sinh, nien_khoa, ngay_het_han, avatar_path, created_at FROM students WHERE ho_ten LIKE %s ORDER BY ho_ten"
-        results = db_manager.execute_query(query, (f'%{keyword}%',))
+        tokens = name_tokens(keyword)
+        if not tokens:
+            return []
+        
+        columns = "s.id, s.mssv, s.ho_ten, s.ngay_sinh, s.nien_khoa, s.ngay_het_han, s.avatar_path, s.created_at"
+        limit_clause = f" LIMIT {int(limit)}" if limit else ""
+        
+        if not StudentDAO._name_tokens_available():
+            query = f"SELECT {columns} FROM students s WHERE s.ho_ten LIKE %s ORDER BY s.ho_ten{limit_clause}"
+            results = db_manager.execute_query(query, (f'%{keyword}%',))
+            return results or []
+        
+        # Mỗi token 1 join: token LIKE 'abc%' là range scan trên primary key (token, student_id)
+        joins = " ".join(
+            f"JOIN student_name_tokens t{i} ON t{i}.student_id = s.id AND t{i}.token LIKE %s"
+            for i in range(len(tokens))
+        )
+        query = f"SELECT DISTINCT {columns} FROM students s {joins} ORDER BY s.ho_ten{limit_clause}"
+        results = db_manager.execute_query(query, tuple(f'{token}%' for token in tokens))
         return results or []
+    
+    @staticmethod
+    def fuzzy_search_by_name(keyword, limit=20, min_similarity=0.3):
+        """
+        Tìm theo tên gần đúng (sai chính tả, OCR nhận sai vài ký tự) bằng index trigram trong RAM
+        
+        Args:
+            keyword: string
+            limit: int - số kết quả tối đa
+            min_similarity: float - ngưỡng độ tương đồng (0-1)
+        
+        Returns:
+            list: List of students (kèm key similarity), sắp xếp theo độ tương đồng giảm dần
+        """
+        from .name_search import get_name_index
+        
+        matches = get_name_index().search(keyword, limit=limit, min_similarity=min_similarity)
+        students = StudentDAO.get_by_ids([student_id for student_id, _ in matches])
+        
+        results = []
+        for student_id, similarity in matches:
+            if student_id in students:
+                student = students[student_id]
+                student['similarity'] = round(similarity, 3)
+                results.append(student)
+        return results
 
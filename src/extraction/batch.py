@@ -0,0 +1,306 @@
+"""
+Trích xuất hàng loạt ảnh thẻ không cần GUI:
+
+    python -m src.extraction.batch cards/ "intake/**/*.jpg" --workers 4 --report report.jsonl
+
+Mỗi worker process load 1 OCR model và xử lý từng nhóm --ocr-batch-size ảnh (process_cards:
+các dòng text của cả nhóm được OCR chung 1 batch), process chính ghi database
+theo batch (StudentDAO.upsert_many, --db-batch-size sinh viên mỗi transaction) và ghi kết quả
+vào report JSONL ngay khi ghi xong (chạy lại với --resume để bỏ qua ảnh đã xử lý).
+"""
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+# Trạng thái đã xong, --resume sẽ bỏ qua các ảnh này
+DONE_STATUSES = ('created', 'updated', 'exists', 'extracted')
+
+# Lỗi khi load model trong worker (exception trong initializer làm Pool tạo lại worker mãi mãi)
+_INIT_ERROR = None
+
+
+def collect_images(inputs):
+    """
+    Danh sách ảnh (không trùng, sắp xếp theo tên) từ các thư mục, file hoặc glob
+
+    Args:
+        inputs: list str
+
+    Returns:
+        list: đường dẫn ảnh
+    """
+    paths = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, _, files in os.walk(item):
+                paths.update(os.path.join(root, name) for name in files)
+        else:
+            paths.update(glob.glob(item, recursive=True))
+
+    return sorted(path for path in paths if path.lower().endswith(IMAGE_EXTENSIONS))
+
+
+def _load_done(report_path):
+    """Các ảnh đã xử lý xong trong report JSONL cũ"""
+    done = set()
+    if not os.path.exists(report_path):
+        return done
+
+    with open(report_path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # dòng cuối bị cắt dở khi process bị dừng
+            if record.get('status') in DONE_STATUSES:
+                done.add(record['path'])
+    return done
+
+
+def _init_worker(num_threads):
+    """Khởi tạo worker: chia CPU giữa các worker rồi load OCR model 1 lần"""
+    global _INIT_ERROR
+    try:
+        import cv2
+        import torch
+        from .ocr_extractor import init_vietocr
+
+        torch.set_num_threads(num_threads)
+        cv2.setNumThreads(1)
+        init_vietocr()
+    except Exception as e:
+        _INIT_ERROR = f"Lỗi khởi tạo worker: {e}"
+
+
+def _process_path(path):
+    """
+    Xử lý 1 ảnh (dùng khi OCR batch của cả nhóm lỗi)
+
+    Returns:
+        tuple: (path, info hoặc None, error hoặc None, thời gian xử lý (s))
+    """
+    import cv2
+    from .card_pipeline import process_card
+
+    start = time.perf_counter()
+    try:
+        image = cv2.imread(path)
+        if image is None:
+            raise ValueError("Không thể đọc ảnh")
+        info = process_card(image)
+        return path, info, None, time.perf_counter() - start
+    except Exception as e:
+        return path, None, str(e), time.perf_counter() - start
+
+
+def _process_paths(paths):
+    """
+    Chạy trong worker: xử lý 1 nhóm ảnh bằng process_cards (OCR chung 1 batch)
+
+    Returns:
+        list: (path, info hoặc None, error hoặc None, thời gian xử lý (s)) của từng ảnh,
+              thời gian của nhóm được chia đều cho các ảnh
+    """
+    if _INIT_ERROR is not None:
+        return [(path, None, _INIT_ERROR, 0.0) for path in paths]
+
+    import cv2
+    from .card_pipeline import process_cards
+
+    start = time.perf_counter()
+    results, readable, images = [], [], []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            results.append((path, None, "Không thể đọc ảnh", 0.0))
+        else:
+            readable.append(path)
+            images.append(image)
+    if not images:
+        return results
+
+    try:
+        infos = process_cards(images)
+    except Exception as e:
+        # Xử lý lại từng ảnh để lỗi của 1 ảnh không làm hỏng cả nhóm
+        print(f"⚠ Lỗi xử lý nhóm {len(images)} ảnh: {e}, chuyển sang từng ảnh")
+        return results + [_process_path(path) for path in readable]
+
+    elapsed = (time.perf_counter() - start) / len(images)
+    return results + [(path, info, None, elapsed) for path, info in zip(readable, infos)]
+
+
+def _prepare_student(info, avatars_dir):
+    """Dữ liệu sinh viên để ghi database (lưu ảnh chân dung), None nếu thiếu MSSV/họ tên"""
+    from .card_pipeline import INFO_FIELDS, save_avatar
+
+    if not info.get('mssv') or not info.get('ho_ten'):
+        return None
+
+    student_data = {key: info[key] for key in INFO_FIELDS if info.get(key)}
+    if info['face_image'] is not None:
+        student_data['avatar_path'] = save_avatar(info['face_image'], info['mssv'], avatars_dir)
+    if info['face_encoding'] is not None:
+        student_data['face_encoding'] = info['face_encoding']
+    return student_data
+
+
+def _save_pending(pending, update_existing):
+    """
+    Ghi các sinh viên đang chờ bằng 1 lần StudentDAO.upsert_many, điền status/student_id vào record
+
+    Args:
+        pending: list (record, student_data)
+    """
+    from ..database.student_dao import StudentDAO
+
+    try:
+        results = StudentDAO.upsert_many([student_data for _, student_data in pending],
+                                         update_existing=update_existing, chunk_size=len(pending))
+    except Exception as e:
+        results = [{'id': None, 'status': 'error', 'error': str(e)}] * len(pending)
+
+    for (record, student_data), result in zip(pending, results):
+        if result['status'] == 'error':
+            record.update(status='db_error', error=result['error'])
+        else:
+            record.update(status=result['status'], student_id=result['id'])
+
+        # Ảnh chân dung không được dùng khi sinh viên đã có sẵn hoặc ghi lỗi
+        if record['status'] in ('exists', 'db_error') and student_data.get('avatar_path'):
+            try:
+                os.remove(student_data['avatar_path'])
+            except OSError:
+                pass
+
+
+def run_batch(paths, report_path, workers=None, avatars_dir='avatars', update_existing=False, save=True,
+              db_batch_size=200, ocr_batch_size=8):
+    """
+    Xử lý danh sách ảnh thẻ bằng process pool, ghi database và report JSONL
+
+    Args:
+        paths: list str - đường dẫn ảnh
+        report_path: str - file JSONL, mỗi dòng 1 ảnh (ghi nối tiếp)
+        workers: int - số process, mặc định APP_CONFIG['batch_workers']
+        avatars_dir: str - thư mục lưu ảnh chân dung
+        update_existing: bool - MSSV đã có thì cập nhật (mặc định bỏ qua)
+        save: bool - False thì chỉ trích xuất, không ghi database
+        db_batch_size: int - số sinh viên ghi database mỗi lần (1 transaction)
+        ocr_batch_size: int - số ảnh mỗi worker xử lý chung (OCR các dòng text trong 1 batch)
+
+    Returns:
+        dict: số ảnh theo từng trạng thái
+    """
+    workers = max(1, min(workers or APP_CONFIG['batch_workers'], len(paths) or 1))
+    ocr_batch_size = max(1, ocr_batch_size)
+    # Nhóm nhỏ hơn khi ít ảnh để worker nào cũng có việc
+    ocr_batch_size = min(ocr_batch_size, max(1, -(-len(paths) // workers)))
+    chunks = [paths[i:i + ocr_batch_size] for i in range(0, len(paths), ocr_batch_size)]
+    num_threads = max(1, (os.cpu_count() or 1) // workers)
+    summary = {}
+
+    if save:
+        from ..database.db_manager import db_manager
+        if not db_manager.connect():
+            raise RuntimeError("Không thể kết nối đến database")
+
+    start = time.perf_counter()
+    pending = []  # (record, student_data) chờ ghi database theo batch
+    completed = 0
+
+    def write_records(records):
+        nonlocal completed
+        for record in records:
+            report.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            completed += 1
+            summary[record['status']] = summary.get(record['status'], 0) + 1
+            print(f"[{completed}/{len(paths)}] {record['status']:<10} {record['path']}")
+        report.flush()
+
+    def flush_pending():
+        if pending:
+            _save_pending(pending, update_existing)
+            write_records([record for record, _ in pending])
+            pending.clear()
+
+    # spawn: torch/OpenMP không an toàn khi fork process đã khởi tạo thread
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(workers, initializer=_init_worker, initargs=(num_threads,)) as pool, \
+            open(report_path, 'a', encoding='utf-8') as report:
+        for path, info, error, elapsed in (result for chunk in pool.imap_unordered(_process_paths, chunks)
+                                           for result in chunk):
+            record = {'path': path, 'seconds': round(elapsed, 3)}
+
+            if error is not None:
+                record.update(status='error', error=error)
+            else:
+                record.update({key: info.get(key) for key in
+                               ('mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han', 'raw_text')})
+                record['card_detected'] = info['card_detected']
+                record['has_face'] = info['face_encoding'] is not None
+
+                if not save:
+                    record['status'] = 'extracted'
+                else:
+                    student_data = _prepare_student(info, avatars_dir)
+                    if student_data is None:
+                        record['status'] = 'incomplete'
+                    else:
+                        pending.append((record, student_data))
+                        if len(pending) >= db_batch_size:
+                            flush_pending()
+                        continue
+
+            write_records([record])
+
+        flush_pending()
+
+    total = time.perf_counter() - start
+    print(f"✓ Đã xử lý {len(paths)} ảnh trong {total:.1f}s ({workers} worker), "
+          + ", ".join(f"{status}={count}" for status, count in sorted(summary.items())))
+    return summary
+
+
+def main():
+    """Trích xuất hàng loạt ảnh thẻ từ dòng lệnh"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Trích xuất hàng loạt ảnh thẻ sinh viên vào database")
+    parser.add_argument('inputs', nargs='+', help="Thư mục, file ảnh hoặc glob (vd. 'cards/**/*.jpg')")
+    parser.add_argument('--workers', type=int, default=None,
+                        help=f"Số process (mặc định {APP_CONFIG['batch_workers']}, biến môi trường BATCH_WORKERS)")
+    parser.add_argument('--report', default='batch_report.jsonl', help="File report JSONL (ghi nối tiếp)")
+    parser.add_argument('--avatars-dir', default='avatars')
+    parser.add_argument('--update', action='store_true', help="Cập nhật sinh viên nếu MSSV đã tồn tại")
+    parser.add_argument('--db-batch-size', type=int, default=200,
+                        help="Số sinh viên ghi database mỗi lần (1 transaction)")
+    parser.add_argument('--ocr-batch-size', type=int, default=8,
+                        help="Số ảnh mỗi worker OCR chung 1 batch")
+    parser.add_argument('--dry-run', action='store_true', help="Chỉ trích xuất và ghi report, không ghi database")
+    parser.add_argument('--resume', action='store_true', help="Bỏ qua các ảnh đã xử lý xong trong report")
+    args = parser.parse_args()
+
+    paths = collect_images(args.inputs)
+    if args.resume:
+        done = _load_done(args.report)
+        paths = [path for path in paths if path not in done]
+    if not paths:
+        parser.error("Không có ảnh nào cần xử lý")
+
+    run_batch(paths, args.report, workers=args.workers, avatars_dir=args.avatars_dir,
+              update_existing=args.update, save=not args.dry_run, db_batch_size=args.db_batch_size,
+              ocr_batch_size=args.ocr_batch_size)
+
+
+if __name__ == "__main__":
+    main()
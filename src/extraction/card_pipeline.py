@@ -0,0 +1,164 @@
+"""Pipeline xử lý 1 ảnh thẻ: detect thẻ -> OCR thông tin -> cắt chân dung -> lưu database"""
+import os
+import uuid
+from datetime import datetime
+
+import cv2
+
+from ..image_processing.card_detector import detect_and_extract_card
+from .ocr_extractor import extract_student_info, extract_student_info_batch
+from .face_extractor import analyze_face
+
+# Các trường thông tin trên thẻ
+INFO_FIELDS = ('mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han')
+
+
+def count_fields(info):
+    """Số trường thông tin đã trích xuất được"""
+    return sum(1 for key in INFO_FIELDS if info.get(key))
+
+
+def _detect_card(image):
+    """Cắt thẻ khỏi ảnh chụp, trả về (ảnh thẻ hoặc ảnh gốc nếu không detect được, success)"""
+    card_extracted, success = detect_and_extract_card(image)
+
+    if not success:
+        card_extracted = image  # Use original if detection fails
+        print("⚠ Card detection failed, using original image")
+    else:
+        print("✓ Card detection successful")
+    return card_extracted, success
+
+
+def _attach_face(info, card_extracted, image, success):
+    """Thêm card_detected, face_image, face_encoding vào info"""
+    info['card_detected'] = success
+    info['face_image'] = None
+    info['face_encoding'] = None
+
+    # Try to extract face from detected card first
+    # 1 lần detect cho cả ảnh chân dung và face encoding
+    face = analyze_face(card_extracted, padding=30)  # padding lớn để lấy đủ đầu và cổ
+
+    # Nếu không tìm thấy trên ảnh đã detect, thử trên ảnh gốc
+    if face is None:
+        print("⚠ No face found in detected card, trying original image...")
+        face = analyze_face(image, padding=30)
+
+    if face is not None:
+        print(f"✓ Face extracted successfully! Size: {face['face_image'].shape}")
+        info['face_image'] = face['face_image']
+
+        if face['encoding'] is not None:
+            info['face_encoding'] = face['encoding']
+            print("✓ Face encoding generated")
+
+    return info
+
+
+def process_card(image):
+    """
+    Trích xuất thông tin và ảnh chân dung từ ảnh chụp thẻ sinh viên
+
+    Args:
+        image: numpy array (BGR image) - ảnh gốc
+
+    Returns:
+        dict: các trường như extract_student_info, thêm:
+            - face_image: numpy array (BGR) hoặc None
+            - face_encoding: numpy array (128,) hoặc None
+            - card_detected: bool
+    """
+    # Detect and extract card
+    card_extracted, success = _detect_card(image)
+
+    # Extract text info - thử với ảnh đã detect trước
+    info = extract_student_info(card_extracted)
+
+    # Nếu ít hơn 2 field và detection đã thành công, thử với ảnh gốc
+    extracted_count = count_fields(info)
+    if extracted_count < 2 and success:
+        print("⚠ Low extraction rate, trying with original image...")
+        original_info = extract_student_info(image)
+        original_count = count_fields(original_info)
+
+        # Nếu ảnh gốc cho kết quả tốt hơn, dùng nó
+        if original_count > extracted_count:
+            print(f"✓ Using original image (extracted {original_count} fields vs {extracted_count})")
+            info = original_info
+            card_extracted = image
+
+    return _attach_face(info, card_extracted, image, success)
+
+
+def process_cards(images):
+    """
+    Như process_card cho nhiều ảnh: các dòng text của mọi thẻ được OCR chung 1 batch
+    (extract_student_info_batch), lần thử lại với ảnh gốc cũng gộp thành 1 batch
+
+    Args:
+        images: list numpy array (BGR image)
+
+    Returns:
+        list: dict (cùng format process_card) của từng ảnh. Thẻ không đọc được text nào
+              có raw_text = '' thay vì raise như process_card
+    """
+    located = [_detect_card(image) for image in images]
+    infos = extract_student_info_batch([card_extracted for card_extracted, _ in located])
+
+    # Thẻ đọc được ít hơn 2 field (dù detect thành công): OCR lại ảnh gốc, chung 1 batch
+    retry = [i for i, (info, (_, success)) in enumerate(zip(infos, located))
+             if success and count_fields(info) < 2]
+    if retry:
+        print(f"⚠ Low extraction rate on {len(retry)} card(s), trying with original images...")
+        for i, original_info in zip(retry, extract_student_info_batch([images[i] for i in retry])):
+            if count_fields(original_info) > count_fields(infos[i]):
+                infos[i] = original_info
+                located[i] = (images[i], located[i][1])
+
+    return [
+        _attach_face(info, card_extracted, image, success)
+        for info, (card_extracted, success), image in zip(infos, located, images)
+    ]
+
+
+def save_avatar(face_image, mssv, avatars_dir='avatars'):
+    """
+    Lưu ảnh chân dung thành avatars_dir/<mssv>_<timestamp>_<uuid>.jpg, trả về đường dẫn.
+    Phần uuid để 2 thẻ cùng MSSV xử lý trong cùng 1 giây (batch) không ghi đè ảnh của nhau
+    """
+    os.makedirs(avatars_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    avatar_path = os.path.join(avatars_dir, f"{mssv}_{timestamp}_{uuid.uuid4().hex[:8]}.jpg")
+    cv2.imwrite(avatar_path, face_image)
+    return avatar_path
+
+
+def save_student(student_data, face_image=None, face_encoding=None, existing=None, avatars_dir='avatars'):
+    """
+    Lưu sinh viên vào database (insert, hoặc update nếu truyền existing)
+
+    Args:
+        student_data: dict các trường trong INFO_FIELDS (bắt buộc có mssv)
+        face_image: numpy array (BGR) - ảnh chân dung, được lưu vào avatars_dir
+        face_encoding: numpy array
+        existing: dict - bản ghi đã có cùng MSSV (StudentDAO.get_by_mssv)
+        avatars_dir: str
+
+    Returns:
+        int: ID của sinh viên (None nếu insert lỗi)
+    """
+    from ..database.student_dao import StudentDAO
+
+    student_data = dict(student_data)
+    if face_image is not None:
+        student_data['avatar_path'] = save_avatar(face_image, student_data['mssv'], avatars_dir)
+    if face_encoding is not None:
+        student_data['face_encoding'] = face_encoding
+
+    if existing:
+        StudentDAO.update(existing['id'], student_data)
+        student_id = existing['id']
+    else:
+        student_id = StudentDAO.create(student_data)
+    return student_id
@@ -1,54 +1,64 @@
 """Face extraction from student card"""
+import os
+import sys
+
 import cv2
 import face_recognition
 import numpy as np
 
+from ..face_matching.face_detection import detect_faces
 
-def extract_face_region(card_image, padding=20):
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
+
+
+def analyze_face(card_image, padding=20, with_encoding=True, with_landmarks=False):
     """
-    Trích xuất vùng chứa khuôn mặt từ ảnh thẻ (bao gồm cả đầu và cổ)
+    Phân tích khuôn mặt trên ảnh thẻ với 1 lần detect: cắt ảnh chân dung (cả đầu và cổ),
+    rồi dùng lại vị trí đã detect để tính landmarks và face encoding (không detect lại)
     
     Args:
         card_image: numpy array (BGR image)
         padding: int - padding cơ bản xung quanh khuôn mặt (pixels)
                   Sẽ được tính toán động dựa trên kích thước khuôn mặt
+        with_encoding: bool - tính face encoding 128 chiều
+        with_landmarks: bool - tính các điểm landmark (mắt, mũi, miệng, ...)
     
     Returns:
-        tuple: (face_image, face_locations)
+        dict hoặc None nếu không tìm thấy khuôn mặt:
             - face_image: numpy array - ảnh chân dung đã crop (toàn bộ đầu và cổ)
-            - face_locations: list - vị trí khuôn mặt (top, right, bottom, left)
+            - crop_box: tuple (top, right, bottom, left) - vùng crop trên ảnh gốc
+            - face_location: tuple (top, right, bottom, left) - khuôn mặt trên ảnh gốc
+            - landmarks: dict tên -> list (x, y) trên ảnh gốc hoặc None
+            - encoding: numpy array (128,) hoặc None
     """
-    # Resize ảnh nếu quá nhỏ (face_recognition hoạt động tốt hơn với ảnh lớn hơn)
+    # Ảnh nhỏ hơn 500px được phóng lên khi detect (face_recognition detect tốt hơn với ảnh lớn hơn)
     h, w = card_image.shape[:2]
-    scale_factor = 1.0
-    
-    # Nếu ảnh nhỏ hơn 500px, resize lên
-    if max(h, w) < 500:
-        scale_factor = 500.0 / max(h, w)
-        new_w = int(w * scale_factor)
-        new_h = int(h * scale_factor)
-        resized_image = cv2.resize(card_image, (new_w, new_h), interpolation=cv2.INTER_CUBIC)
-        print(f"  Resized image from {card_image.shape} to {resized_image.shape} for better face detection")
-    else:
-        resized_image = card_image.copy()
+    scale_factor = 500.0 / max(h, w) if max(h, w) < 500 else 1.0
+    if scale_factor != 1.0:
+        print(f"  Detecting on image resized from {card_image.shape[:2]} to "
+              f"{(int(h * scale_factor), int(w * scale_factor))} for better face detection")
     
     # Convert BGR to RGB (face_recognition uses RGB)
-    rgb_image = cv2.cvtColor(resized_image, cv2.COLOR_BGR2RGB)
+    rgb_image = cv2.cvtColor(card_image, cv2.COLOR_BGR2RGB)
     
-    # Thử detect với HOG model trước (nhanh)
-    face_locations = face_recognition.face_locations(rgb_image, model='hog', number_of_times_to_upsample=1)
+    # Thử detect với HOG model trước (nhanh). CARD_FACE_DETECT_SCALES tính theo ảnh đã phóng lên,
+    # box trả về theo tọa độ ảnh gốc: crop, landmarks và encoding đều dùng ảnh gốc
+    detect_scales = tuple(scale * scale_factor for scale in APP_CONFIG['card_face_detect_scales'])
+    face_locations = detect_faces(rgb_image, detect_scales, upsample=1)
     
     # Nếu không tìm thấy, thử với CNN model (chính xác hơn nhưng chậm)
     if not face_locations:
         print("  Trying CNN model for face detection...")
         try:
-            face_locations = face_recognition.face_locations(rgb_image, model='cnn', number_of_times_to_upsample=0)
+            face_locations = detect_faces(rgb_image, (scale_factor,), upsample=0, model='cnn')
         except Exception as e:
             print(f"  CNN model failed: {e}, continuing...")
     
     if not face_locations:
-        print(f"  No faces detected. Image shape: {resized_image.shape}")
-        return None, None
+        print(f"  No faces detected. Image shape: {card_image.shape}")
+        return None
     
     print(f"  Found {len(face_locations)} face(s)")
     
@@ -56,8 +66,10 @@ def extract_face_region(card_image, padding=20):
     # Sắp xếp theo diện tích
     face_areas = [(bottom - top) * (right - left) for (top, right, bottom, left) in face_locations]
     largest_face_idx = np.argmax(face_areas)
+    face_location = tuple(int(v) for v in face_locations[largest_face_idx])
     
-    top, right, bottom, left = face_locations[largest_face_idx]
+    # Padding được tính trên tọa độ của ảnh đã phóng lên (như khi detect)
+    top, right, bottom, left = (int(round(v * scale_factor)) for v in face_location)
     print(f"  Largest face location (on resized): top={top}, right={right}, bottom={bottom}, left={left}")
     
     # Tính toán padding động dựa trên kích thước khuôn mặt
@@ -85,7 +97,7 @@ def extract_face_region(card_image, padding=20):
     print(f"  Dynamic padding - top: {padding_top}, bottom: {padding_bottom}, left: {padding_left}, right: {padding_right}")
     
     # Thêm padding trên ảnh đã resize
-    resized_h, resized_w = resized_image.shape[:2]
+    resized_h, resized_w = int(h * scale_factor), int(w * scale_factor)
     top_padded = max(0, top - padding_top)
     left_padded = max(0, left - padding_left)
     bottom_padded = min(resized_h, bottom + padding_bottom)
@@ -130,12 +142,52 @@ def extract_face_region(card_image, padding=20):
     # Kiểm tra kích thước ảnh sau khi crop
     if face_image.size == 0 or face_image.shape[0] == 0 or face_image.shape[1] == 0:
         print("  Warning: Cropped face image is empty!")
-        return None, None
+        return None
     
     print(f"  Face image cropped (full head + neck): {face_image.shape}")
     print(f"  Crop ratio: {face_image.shape[1]/face_image.shape[0]:.2f} (width/height)")
     
-    return face_image, (top_final, right_final, bottom_final, left_final)
+    result = {
+        'face_image': face_image,
+        'crop_box': (top_final, right_final, bottom_final, left_final),
+        'face_location': face_location,
+        'landmarks': None,
+        'encoding': None,
+    }
+    
+    # Dùng lại vị trí vừa detect, face_recognition không phải chạy HOG lần nữa. Tính trên ảnh gốc
+    # (không phải bản phóng lên) để encoding so sánh được với encoding đã lưu trước đây
+    location = [face_location]
+    if with_landmarks:
+        landmarks = face_recognition.face_landmarks(rgb_image, location)
+        if landmarks:
+            result['landmarks'] = landmarks[0]
+    if with_encoding:
+        encodings = face_recognition.face_encodings(rgb_image, location)
+        if encodings:
+            result['encoding'] = encodings[0]
+    
+    return result
+
+
+def extract_face_region(card_image, padding=20):
+    """
+    Trích xuất vùng chứa khuôn mặt từ ảnh thẻ (bao gồm cả đầu và cổ)
+    
+    Args:
+        card_image: numpy array (BGR image)
+        padding: int - padding cơ bản xung quanh khuôn mặt (pixels)
+                  Sẽ được tính toán động dựa trên kích thước khuôn mặt
+    
+    Returns:
+        tuple: (face_image, face_locations)
+            - face_image: numpy array - ảnh chân dung đã crop (toàn bộ đầu và cổ)
+            - face_locations: list - vị trí khuôn mặt (top, right, bottom, left)
+    """
+    result = analyze_face(card_image, padding, with_encoding=False)
+    if result is None:
+        return None, None
+    return result['face_image'], result['crop_box']
 
 
 def extract_and_save_face(card_image, output_path, padding=20):
@@ -175,7 +227,7 @@ def get_face_encoding_from_card(card_image):
     rgb_image = cv2.cvtColor(card_image, cv2.COLOR_BGR2RGB)
     
     # Detect faces
-    face_locations = face_recognition.face_locations(rgb_image, model='hog')
+    face_locations = detect_faces(rgb_image, APP_CONFIG['card_face_detect_scales'])
     
     if not face_locations:
         return None
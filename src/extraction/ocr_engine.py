@@ -0,0 +1,290 @@
+"""Pluggable OCR engines (VietOCR pip / vendored) với cùng một API batch"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.ocr import OCR_CONFIG
+
+
+class OCREngine:
+    """
+    Interface chung cho các backend OCR.
+
+    - Model chỉ được load khi cần (lần predict đầu tiên hoặc gọi load())
+    - predict_batch(images) nhận list PIL Image (RGB), trả về list text cùng thứ tự
+    - report() trả về thời gian load và latency trung bình để so sánh các backend
+    - quantize=True: lượng tử hóa int8 model sau khi load (chỉ CPU)
+    """
+
+    name = None
+
+    def __init__(self, device='cpu', quantize=False):
+        self.device = device
+        self.quantize = quantize
+        self.model = None
+        self.load_time = None
+        self.calls = 0
+        self.lines = 0
+        self.total_time = 0.0
+        self._lock = threading.Lock()
+
+    def _load(self):
+        """Tạo model/predictor của backend"""
+        raise NotImplementedError
+
+    def _predict_batch(self, images):
+        """OCR list PIL Image bằng model đã load"""
+        raise NotImplementedError
+
+    def _torch_model(self):
+        """nn.Module VietOCR bên trong predictor (dùng cho quantization)"""
+        raise NotImplementedError
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def load(self):
+        """Load model nếu chưa load (thread-safe)"""
+        with self._lock:
+            if self.model is None:
+                start = time.perf_counter()
+                self.model = self._load()
+                if self.quantize:
+                    from src.vietocr.tool.quantize import quantize_model
+                    quantize_model(self._torch_model())
+                self.load_time = time.perf_counter() - start
+                print(f"✓ OCR engine '{self.name}' đã load trong {self.load_time:.2f}s, "
+                      f"device={self.device}{', int8' if self.quantize else ''}")
+        return self
+
+    def predict_batch(self, images):
+        """
+        OCR nhiều ảnh dòng text trong 1 lần gọi
+
+        Args:
+            images: list PIL Image (RGB)
+
+        Returns:
+            list: text của từng ảnh, cùng thứ tự đầu vào
+        """
+        if not images:
+            return []
+
+        self.load()
+
+        start = time.perf_counter()
+        texts = list(self._predict_batch(images))
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            self.calls += 1
+            self.lines += len(images)
+            self.total_time += elapsed
+
+        return texts
+
+    def predict(self, image):
+        """OCR 1 ảnh dòng text (PIL Image RGB)"""
+        return self.predict_batch([image])[0]
+
+    def report(self):
+        """
+        Báo cáo thời gian khởi động và latency
+
+        Returns:
+            dict: backend, device, load_time (s), calls, lines, total_time (s), ms_per_line
+        """
+        return {
+            'backend': self.name,
+            'device': self.device,
+            'quantize': self.quantize,
+            'load_time': self.load_time,
+            'calls': self.calls,
+            'lines': self.lines,
+            'total_time': self.total_time,
+            'ms_per_line': (self.total_time / self.lines * 1000) if self.lines else None,
+        }
+
+
+class PipVietOCREngine(OCREngine):
+    """
+    Backend dùng gói vietocr từ pip.
+    Config và weights được cache trong OCR_CONFIG['cache_dir'] (gói vietocr mặc định tải lại
+    config qua mạng mỗi lần khởi động), backbone không nạp weights ImageNet vì bị ghi đè ngay.
+    """
+
+    config_name = None
+
+    def _load_config(self):
+        from vietocr.tool.config import Cfg
+
+        cache_path = os.path.join(OCR_CONFIG['cache_dir'], f"{self.config_name}.yml")
+        if os.path.exists(cache_path):
+            return Cfg.load_config_from_file(cache_path)
+
+        if OCR_CONFIG['offline']:
+            raise FileNotFoundError(f"Chế độ offline: chưa có config {cache_path}")
+
+        config = Cfg.load_config_from_name(self.config_name)
+        os.makedirs(OCR_CONFIG['cache_dir'], exist_ok=True)
+        # Ghi ra file tạm riêng rồi đổi tên: các worker của batch CLI có thể cùng ghi lần đầu
+        tmp_path = f"{cache_path}.{os.getpid()}.part"
+        config.save(tmp_path)
+        os.replace(tmp_path, cache_path)
+        return config
+
+    def _load(self):
+        from vietocr.tool.predictor import Predictor
+        from src.vietocr.tool.utils import download_weights
+
+        config = self._load_config()
+        config['device'] = self.device
+        config['cnn']['pretrained'] = False
+        config['weights'] = download_weights(config['weights'], cache_dir=OCR_CONFIG['cache_dir'],
+                                             offline=OCR_CONFIG['offline'])
+        return Predictor(config)
+
+    def _predict_batch(self, images):
+        return self.model.predict_batch(images)
+
+    def _torch_model(self):
+        return self.model.model
+
+
+class VietOCRSeq2SeqEngine(PipVietOCREngine):
+    """vietocr pip, cấu hình vgg_seq2seq (mặc định, nhanh nhất trên CPU)"""
+
+    name = 'vietocr_seq2seq'
+    config_name = 'vgg_seq2seq'
+
+
+class VietOCRTransformerEngine(PipVietOCREngine):
+    """vietocr pip, cấu hình vgg_transformer"""
+
+    name = 'vietocr_transformer'
+    config_name = 'vgg_transformer'
+
+
+class VendoredTransformerEngine(OCREngine):
+    """Model vgg-transformer vendored trong src/vietocr (weights theo config/ocr.py)"""
+
+    name = 'vendored_transformer'
+
+    def _load(self):
+        from src.vietocr.text_recognition import TextRecognition
+
+        return TextRecognition(device=self.device)
+
+    def _predict_batch(self, images):
+        return self.model.predict_on_batch([np.asarray(img.convert('RGB')) for img in images])
+
+    def _torch_model(self):
+        return self.model.detector.model
+
+
+class TorchScriptTransformerEngine(OCREngine):
+    """
+    Model vgg-transformer đã export TorchScript (python -m src.vietocr.tool.export),
+    khởi động không cần build model/torchvision. Muốn int8 thì export với --quantize.
+    """
+
+    name = 'torchscript_transformer'
+
+    def _load(self):
+        from config.ocr import text_recognition
+        from src.vietocr.tool.predictor import ScriptedPredictor
+
+        if self.quantize:
+            raise ValueError("Backend torchscript_transformer: hãy export với --quantize thay vì OCR_QUANTIZE")
+        return ScriptedPredictor(text_recognition['torchscript_dir'], device=self.device)
+
+    def _predict_batch(self, images):
+        return self.model.batch_predict([np.asarray(img.convert('RGB')) for img in images])
+
+
+OCR_BACKENDS = {
+    engine.name: engine
+    for engine in (VietOCRSeq2SeqEngine, VietOCRTransformerEngine, VendoredTransformerEngine,
+                   TorchScriptTransformerEngine)
+}
+
+_ENGINES = {}
+_ENGINES_LOCK = threading.Lock()
+
+
+def get_ocr_engine(backend=None, device=None, quantize=None):
+    """
+    Lấy OCR engine (chưa load model) theo tên backend, mỗi (backend, device, quantize) dùng chung 1 instance
+
+    Args:
+        backend: str - tên trong OCR_BACKENDS, mặc định OCR_CONFIG['backend']
+        device: str - mặc định OCR_CONFIG['device']
+        quantize: bool - lượng tử hóa int8, mặc định OCR_CONFIG['quantize']
+
+    Returns:
+        OCREngine
+    """
+    backend = backend or OCR_CONFIG['backend']
+    device = device or OCR_CONFIG['device']
+    quantize = OCR_CONFIG['quantize'] if quantize is None else quantize
+
+    if backend not in OCR_BACKENDS:
+        raise ValueError(f"OCR backend không hợp lệ: {backend}. Các backend hỗ trợ: {', '.join(OCR_BACKENDS)}")
+    if quantize and device != 'cpu':
+        raise ValueError("Quantization int8 chỉ hỗ trợ device=cpu")
+
+    with _ENGINES_LOCK:
+        key = (backend, device, quantize)
+        if key not in _ENGINES:
+            _ENGINES[key] = OCR_BACKENDS[backend](device=device, quantize=quantize)
+        return _ENGINES[key]
+
+
+def _load_line_crops(folder):
+    """Đọc các ảnh dòng text (png/jpg/bmp) trong folder, sắp xếp theo tên file"""
+    from PIL import Image
+
+    names = sorted(
+        name for name in os.listdir(folder)
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp'))
+    )
+    return names, [Image.open(os.path.join(folder, name)).convert('RGB') for name in names]
+
+
+def main():
+    """So sánh thời gian load và latency của các backend trên 1 folder ảnh dòng text"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark các OCR backend")
+    parser.add_argument('crops_dir', help="Folder chứa ảnh các dòng text đã cắt")
+    parser.add_argument('--backend', action='append', choices=list(OCR_BACKENDS),
+                        help="Backend cần đo (có thể lặp lại), mặc định tất cả")
+    parser.add_argument('--device', default=None)
+    args = parser.parse_args()
+
+    _, images = _load_line_crops(args.crops_dir)
+    if not images:
+        parser.error(f"Không có ảnh nào trong {args.crops_dir}")
+
+    for backend in args.backend or list(OCR_BACKENDS):
+        engine = get_ocr_engine(backend, args.device)
+        try:
+            engine.load()
+            engine.predict_batch(images)
+        except Exception as e:
+            print(f"⚠ Backend {backend} lỗi: {e}")
+            continue
+
+        report = engine.report()
+        print(f"{report['backend']:<22} load={report['load_time']:.2f}s  "
+              f"{report['lines']} dòng  {report['ms_per_line']:.1f} ms/dòng")
+
+
+if __name__ == "__main__":
+    main()
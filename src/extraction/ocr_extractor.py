@@ -1,31 +1,27 @@
-"""OCR extraction using VietOCR (pip package)"""
+"""OCR extraction using VietOCR (backend chọn trong config/ocr.py)"""
 from PIL import Image
 import cv2
 import re
 import os
 from datetime import datetime
-from vietocr.tool.predictor import Predictor
-from vietocr.tool.config import Cfg
+from .ocr_engine import get_ocr_engine
 from ..image_processing.preprocessor import preprocess_for_ocr, enhance_contrast, normalize_image
 
-# Khởi tạo global predictor, dùng cấu hình 'vgg_seq2seq' với pretrained weight
+# Global OCR engine, backend mặc định là 'vietocr_seq2seq' (vietocr pip, cấu hình vgg_seq2seq)
 VIETOCR_PREDICTOR = None
 
 
 def init_vietocr():
     """
-    Khởi tạo VietOCR Predictor dùng gói vietocr từ pip.
-    Dùng config 'vgg_seq2seq' (thư viện tự xử lý pretrained weights).
+    Khởi tạo OCR engine theo OCR_CONFIG (config/ocr.py).
+    Mặc định dùng gói vietocr từ pip với config 'vgg_seq2seq'
+    (thư viện tự xử lý pretrained weights).
     """
     global VIETOCR_PREDICTOR
     if VIETOCR_PREDICTOR is not None:
         return VIETOCR_PREDICTOR
 
-    config = Cfg.load_config_from_name("vgg_seq2seq")
-    config["device"] = "cpu"  # chạy CPU cho an toàn
-
-    VIETOCR_PREDICTOR = Predictor(config)
-    print("✓ VietOCR (pip) đã được khởi tạo với cấu hình vgg_seq2seq, device=cpu.")
+    VIETOCR_PREDICTOR = get_ocr_engine().load()
     return VIETOCR_PREDICTOR
 
 
@@ -71,45 +67,95 @@ def _detect_text_lines(card_image_bgr):
     return [roi for _, roi in rois]
 
 
-def extract_text(image):
+def _ocr_lines(predictor, line_images):
     """
-    Trích xuất text từ ảnh thẻ bằng VietOCR:
-    - Tách các dòng text (ROI)
-    - OCR từng dòng bằng VietOCR
-    - Ghép thành 1 chuỗi text lớn để parser xử lý
-    
+    OCR nhiều dòng trong 1 lần gọi predict_batch (gom theo chiều rộng ảnh).
+    Nếu batch lỗi thì quay về OCR từng dòng.
+
     Args:
-        image: numpy array (BGR image)
-    
+        predictor: OCREngine (xem ocr_engine.py)
+        line_images: list numpy array (BGR)
+
     Returns:
-        str: Extracted text (multi-line)
+        list: text của từng dòng, cùng thứ tự với line_images ('' nếu lỗi)
     """
-    predictor = init_vietocr()
+    pil_images = [Image.fromarray(cv2.cvtColor(line_img, cv2.COLOR_BGR2RGB)) for line_img in line_images]
 
-    # 1) Tách các dòng text trên ảnh thẻ
-    line_images = _detect_text_lines(image)
-
-    # Nếu detect thất bại, dùng cả ảnh gốc như 1 dòng
-    if not line_images:
-        line_images = [image]
+    try:
+        return list(predictor.predict_batch(pil_images))
+    except Exception as e:
+        print(f"⚠ Lỗi OCR batch: {e}, chuyển sang OCR từng dòng")
 
     texts = []
-
-    for idx, line_img in enumerate(line_images):
+    for idx, pil_img in enumerate(pil_images):
         try:
-            rgb = cv2.cvtColor(line_img, cv2.COLOR_BGR2RGB)
-            pil_img = Image.fromarray(rgb)
+            texts.append(predictor.predict(pil_img))
+        except Exception as e:
+            print(f"⚠ Lỗi OCR dòng {idx+1}: {e}")
+            texts.append('')
+    return texts
 
-            line_text = predictor.predict(pil_img)
+
+def extract_text_batch(images):
+    """
+    Trích xuất text từ nhiều ảnh thẻ cùng lúc:
+    - Tách các dòng text (ROI) của tất cả thẻ
+    - OCR toàn bộ các dòng trong 1 lần gọi batch
+    - Ghép lại theo từng thẻ, đúng thứ tự dòng từ trên xuống
+
+    Args:
+        images: list numpy array (BGR image)
+
+    Returns:
+        list: text (multi-line) của từng thẻ, '' nếu không đọc được
+    """
+    predictor = init_vietocr()
+
+    # 1) Tách các dòng text trên từng ảnh thẻ
+    card_lines = []
+    for image in images:
+        line_images = _detect_text_lines(image)
+
+        # Nếu detect thất bại, dùng cả ảnh gốc như 1 dòng
+        if not line_images:
+            line_images = [image]
+        card_lines.append(line_images)
+
+    # 2) OCR tất cả các dòng trong 1 batch
+    all_lines = [line_img for line_images in card_lines for line_img in line_images]
+    all_texts = _ocr_lines(predictor, all_lines) if all_lines else []
+
+    # 3) Ghép kết quả về từng thẻ
+    results = []
+    offset = 0
+    for card_idx, line_images in enumerate(card_lines):
+        texts = []
+        for idx, line_text in enumerate(all_texts[offset:offset + len(line_images)]):
             if isinstance(line_text, str):
                 line_text = line_text.strip()
             if line_text:
-                print(f"✓ VietOCR line {idx+1}: {line_text}")
+                print(f"✓ VietOCR card {card_idx+1} line {idx+1}: {line_text}")
                 texts.append(line_text)
-        except Exception as e:
-            print(f"⚠ Lỗi OCR dòng {idx+1}: {e}")
+        offset += len(line_images)
+        results.append("\n".join(texts).strip())
+
+    return results
 
-    full_text = "\n".join(texts).strip()
+
+def extract_text(image):
+    """
+    Trích xuất text từ ảnh thẻ bằng VietOCR:
+    - Tách các dòng text (ROI)
+    - OCR tất cả các dòng trong 1 lần gọi batch
+    - Ghép thành 1 chuỗi text lớn để parser xử lý
+    
+    Args:
+        image: numpy array (BGR image)
+    
+    Returns:
+        str: Extracted text (multi-line)
+    """
+    full_text = extract_text_batch([image])[0]
     if not full_text:
         raise RuntimeError("VietOCR không đọc được text nào từ ảnh thẻ.")
 
@@ -705,6 +751,18 @@ def parse_ngay_het_han(text):
     return None
 
 
+def _parse_student_info(raw_text):
+    """Parse các trường thông tin sinh viên từ raw text OCR"""
+    return {
+        'mssv': parse_mssv(raw_text),
+        'ho_ten': parse_ho_ten(raw_text),
+        'ngay_sinh': parse_ngay_sinh(raw_text),
+        'nien_khoa': parse_nien_khoa(raw_text),
+        'ngay_het_han': parse_ngay_het_han(raw_text),
+        'raw_text': raw_text
+    }
+
+
 def extract_student_info(image):
     """
     Trích xuất tất cả thông tin sinh viên từ ảnh thẻ
@@ -730,14 +788,7 @@ def extract_student_info(image):
     print("=======================================\n")
     
     # Parse các trường
-    info = {
-        'mssv': parse_mssv(raw_text),
-        'ho_ten': parse_ho_ten(raw_text),
-        'ngay_sinh': parse_ngay_sinh(raw_text),
-        'nien_khoa': parse_nien_khoa(raw_text),
-        'ngay_het_han': parse_ngay_het_han(raw_text),
-        'raw_text': raw_text
-    }
+    info = _parse_student_info(raw_text)
     
     # Debug: in kết quả parse
     print("=== Parsed Results ===")
@@ -748,3 +799,16 @@ def extract_student_info(image):
     
     return info
 
+
+def extract_student_info_batch(images):
+    """
+    Trích xuất thông tin sinh viên từ nhiều ảnh thẻ, OCR chung 1 batch
+
+    Args:
+        images: list numpy array (BGR image)
+
+    Returns:
+        list: dict thông tin (cùng format extract_student_info) của từng thẻ.
+              Thẻ không đọc được text nào có raw_text = '' và các trường = None
+    """
+    return [_parse_student_info(raw_text) for raw_text in extract_text_batch(images)]
@@ -0,0 +1,73 @@
+"""Load trước các model nặng (VietOCR, dlib) ở thread nền để lần dùng đầu không phải chờ"""
+import threading
+import time
+
+import numpy as np
+
+# Trạng thái warm-up, GUI đọc để biết model nào đã sẵn sàng
+OCR_READY = threading.Event()
+FACE_READY = threading.Event()
+
+_WARMUP_THREAD = None
+_WARMUP_LOCK = threading.Lock()
+
+
+def warm_up_ocr():
+    """Load OCR engine (dùng chung với ocr_extractor.VIETOCR_PREDICTOR)"""
+    from .ocr_extractor import init_vietocr
+
+    init_vietocr()
+    OCR_READY.set()
+
+
+def warm_up_face():
+    """
+    Import face_recognition (load model dlib) và chạy thử detect + encode trên ảnh trống
+    để khởi tạo luôn HOG detector, shape predictor và mạng encoding
+    """
+    import face_recognition
+
+    image = np.zeros((150, 150, 3), dtype=np.uint8)
+    face_recognition.face_locations(image, model='hog')
+    face_recognition.face_encodings(image, known_face_locations=[(0, 150, 150, 0)])
+    FACE_READY.set()
+
+
+def start_warmup(status_callback=None):
+    """
+    Chạy warm-up ở daemon thread (chỉ 1 lần cho cả ứng dụng)
+
+    Args:
+        status_callback: function(message, ready) - được gọi từ thread nền
+                         mỗi khi có thay đổi trạng thái, ready=True khi đã xong
+
+    Returns:
+        threading.Thread
+    """
+    global _WARMUP_THREAD
+
+    def notify(message, ready=False):
+        print(message)
+        if status_callback:
+            status_callback(message, ready)
+
+    def run():
+        start = time.perf_counter()
+        errors = []
+        for name, task in (("OCR", warm_up_ocr), ("khuôn mặt", warm_up_face)):
+            notify(f"Đang tải model {name}...")
+            try:
+                task()
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+
+        if errors:
+            notify(f"⚠ Lỗi tải model ({'; '.join(errors)}), sẽ thử lại khi sử dụng", ready=True)
+        else:
+            notify(f"✓ Sẵn sàng (model đã tải trong {time.perf_counter() - start:.1f}s)", ready=True)
+
+    with _WARMUP_LOCK:
+        if _WARMUP_THREAD is None:
+            _WARMUP_THREAD = threading.Thread(target=run, name="model-warmup", daemon=True)
+            _WARMUP_THREAD.start()
+        return _WARMUP_THREAD
@@ -0,0 +1,135 @@
+"""
+Detect khuôn mặt trên bản thu nhỏ của ảnh, box được đổi lại về tọa độ ảnh gốc để tính
+encoding/landmarks trên ảnh độ phân giải đầy đủ.
+
+scales là danh sách tỉ lệ thử lần lượt (vd. (0.5, 1.0)): dừng ở tỉ lệ đầu tiên tìm thấy
+khuôn mặt, nên ảnh có khuôn mặt rõ chỉ tốn 1 lần HOG trên ảnh nhỏ (~1/4 số pixel với 0.5),
+ảnh khó vẫn được detect lại ở tỉ lệ lớn hơn. Đo recall và tốc độ từng tỉ lệ trên ảnh thẻ:
+
+    python -m src.face_matching.face_detection path/to/cards --scales 0.25,0.5,0.75,1.0
+"""
+import cv2
+import face_recognition
+import numpy as np
+
+
+def _scale_box(box, factor, shape):
+    """Nhân box (top, right, bottom, left) với factor, giới hạn trong ảnh có kích thước shape"""
+    height, width = shape[:2]
+    top, right, bottom, left = (int(round(v * factor)) for v in box)
+    return max(0, top), min(width, right), min(height, bottom), max(0, left)
+
+
+def detect_faces_at_scale(rgb_image, scale, upsample=1, model='hog'):
+    """
+    Detect trên ảnh đã resize theo scale
+
+    Returns:
+        list box (top, right, bottom, left) trên ảnh gốc
+    """
+    if scale == 1.0:
+        return face_recognition.face_locations(rgb_image, number_of_times_to_upsample=upsample, model=model)
+
+    height, width = rgb_image.shape[:2]
+    size = (max(1, int(width * scale)), max(1, int(height * scale)))
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    resized = cv2.resize(rgb_image, size, interpolation=interpolation)
+    locations = face_recognition.face_locations(resized, number_of_times_to_upsample=upsample, model=model)
+    return [_scale_box(box, 1.0 / scale, rgb_image.shape) for box in locations]
+
+
+def detect_faces(rgb_image, scales=(1.0,), upsample=1, model='hog'):
+    """
+    Detect khuôn mặt, thử lần lượt các tỉ lệ trong scales tới khi tìm thấy
+
+    Args:
+        rgb_image: numpy array (RGB)
+        scales: tuple float - tỉ lệ resize trước khi detect (1.0 = ảnh gốc)
+        upsample: int - number_of_times_to_upsample của face_recognition
+        model: 'hog' hoặc 'cnn'
+
+    Returns:
+        list box (top, right, bottom, left) trên ảnh gốc
+    """
+    for scale in scales:
+        locations = detect_faces_at_scale(rgb_image, scale, upsample, model)
+        if locations:
+            return locations
+    return []
+
+
+def _largest(boxes):
+    return max(boxes, key=lambda box: (box[2] - box[0]) * (box[1] - box[3])) if boxes else None
+
+
+def main():
+    """Đo recall và thời gian detect ở từng tỉ lệ so với detect trên ảnh gốc (tập ảnh thẻ)"""
+    import argparse
+    import glob
+    import os
+    import time
+
+    from .face_tracker import box_iou
+
+    parser = argparse.ArgumentParser(description="Benchmark detect khuôn mặt trên ảnh thu nhỏ")
+    parser.add_argument('images', help="Thư mục ảnh thẻ")
+    parser.add_argument('--scales', default='0.25,0.5,0.75,1.0', help="Các tỉ lệ cần đo, cách nhau bằng dấu phẩy")
+    parser.add_argument('--upsample', type=int, default=1)
+    parser.add_argument('--min-size', type=int, default=500,
+                        help="Phóng ảnh nhỏ hơn kích thước này lên trước khi detect (như analyze_face)")
+    parser.add_argument('--iou', type=float, default=0.5, help="IoU tối thiểu để tính là detect đúng")
+    args = parser.parse_args()
+
+    scales = [float(scale) for scale in args.scales.split(',')]
+    paths = sorted(path for ext in ('jpg', 'jpeg', 'png', 'bmp')
+                   for path in glob.glob(os.path.join(args.images, f'*.{ext}')))
+    if not paths:
+        parser.error(f"Không có ảnh nào trong {args.images}")
+
+    images = []
+    for path in paths:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"⚠ Không đọc được {path}")
+            continue
+        h, w = image.shape[:2]
+        if max(h, w) < args.min_size:
+            factor = args.min_size / max(h, w)
+            image = cv2.resize(image, (int(w * factor), int(h * factor)), interpolation=cv2.INTER_CUBIC)
+        images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+
+    # Chuẩn: khuôn mặt lớn nhất detect được trên ảnh gốc và encoding của nó
+    references = []
+    for rgb_image in images:
+        box = _largest(detect_faces_at_scale(rgb_image, 1.0, args.upsample))
+        encoding = face_recognition.face_encodings(rgb_image, [box])[0] if box else None
+        references.append((box, encoding))
+    with_face = sum(1 for box, _ in references if box)
+    print(f"{len(images)} ảnh, {with_face} ảnh có khuôn mặt khi detect trên ảnh gốc")
+
+    def run(detect):
+        found, distances, elapsed = 0, [], 0.0
+        for rgb_image, (ref_box, ref_encoding) in zip(images, references):
+            start = time.perf_counter()
+            box = _largest(detect(rgb_image))
+            elapsed += time.perf_counter() - start
+            if ref_box is None or box is None or box_iou(box, ref_box) < args.iou:
+                continue
+            found += 1
+            # Encoding tính trên ảnh gốc với box từ ảnh thu nhỏ
+            encoding = face_recognition.face_encodings(rgb_image, [box])[0]
+            distances.append(float(np.linalg.norm(encoding - ref_encoding)))
+        recall = found / with_face * 100 if with_face else 0.0
+        distance = f"{np.mean(distances):.3f}" if distances else "-"
+        return recall, elapsed / len(images) * 1000, distance
+
+    for scale in scales:
+        recall, ms, distance = run(lambda rgb_image: detect_faces_at_scale(rgb_image, scale, args.upsample))
+        print(f"  scale={scale:<5} recall={recall:5.1f}%  {ms:7.1f} ms/ảnh  distance tới encoding gốc={distance}")
+
+    recall, ms, distance = run(lambda rgb_image: detect_faces(rgb_image, scales, args.upsample))
+    print(f"  lần lượt {scales}: recall={recall:5.1f}%  {ms:7.1f} ms/ảnh  distance tới encoding gốc={distance}")
+
+
+if __name__ == "__main__":
+    main()
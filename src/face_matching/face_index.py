@@ -0,0 +1,396 @@
+"""In-memory index các face encoding để tìm kiếm khuôn mặt bằng 1 phép tính vector hóa"""
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
+
+ENCODING_DIM = 128
+
+
+class FaceIndex:
+    """
+    Giữ toàn bộ face encoding trong 1 ma trận float32 liên tục (N, 128) song song với mảng id.
+    Thông tin sinh viên không nằm trong index, chỉ lấy từ database cho các kết quả trả về.
+
+    search() tính khoảng cách euclidean tới mọi encoding bằng 1 phép nhân ma trận
+    (||a - q||^2 = ||a||^2 - 2 a.q + ||q||^2, ||a||^2 tính sẵn) rồi lấy top-k bằng argpartition.
+    upsert()/remove() sửa trực tiếp trên ma trận (xóa bằng cách chuyển dòng cuối vào chỗ trống),
+    ma trận được nới rộng gấp đôi khi đầy để thêm sinh viên không phải copy lại mỗi lần.
+    """
+
+    # Các mảng song song theo dòng (được nới rộng và hoán đổi dòng cùng nhau)
+    _ARRAYS = ('_ids', '_encodings', '_sq_norms')
+
+    def __init__(self, ids=None, encodings=None):
+        """
+        Args:
+            ids: numpy array int (N,)
+            encodings: numpy array float32 (N, 128) - được dùng trực tiếp, không copy
+        """
+        self._lock = threading.RLock()
+
+        if ids is None:
+            ids = np.zeros(0, dtype=np.int64)
+            encodings = np.zeros((0, ENCODING_DIM), dtype=np.float32)
+
+        self._size = len(ids)
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._encodings = np.ascontiguousarray(encodings, dtype=np.float32)
+        self._sq_norms = np.einsum('ij,ij->i', self._encodings, self._encodings)
+        self._positions = {int(student_id): i for i, student_id in enumerate(self._ids)}
+
+    @classmethod
+    def from_students(cls, students, **kwargs):
+        """Tạo index từ list dict sinh viên có 'id' và 'face_encoding'"""
+        rows = [student for student in students if student.get('face_encoding') is not None]
+        ids = np.array([student['id'] for student in rows], dtype=np.int64)
+        encodings = np.array([student['face_encoding'] for student in rows], dtype=np.float32).reshape(-1, ENCODING_DIM)
+        return cls(ids, encodings, **kwargs)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, student_id):
+        return student_id in self._positions
+
+    @property
+    def ids(self):
+        return self._ids[:self._size]
+
+    def _grow(self):
+        capacity = max(64, len(self._ids) * 2)
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    def upsert(self, student_id, face_encoding):
+        """
+        Thêm hoặc thay encoding của 1 sinh viên (face_encoding None thì xóa khỏi index)
+        """
+        if face_encoding is None:
+            self.remove(student_id)
+            return
+
+        with self._lock:
+            position = self._positions.get(student_id)
+            if position is None:
+                if self._size == len(self._ids):
+                    self._grow()
+                position = self._size
+                self._size += 1
+                self._positions[student_id] = position
+
+            encoding = np.asarray(face_encoding, dtype=np.float32)
+            self._ids[position] = student_id
+            self._encodings[position] = encoding
+            self._sq_norms[position] = encoding @ encoding
+            self._on_row_updated(position, encoding)
+
+    def _on_row_updated(self, position, encoding):
+        """Hook cho index con khi 1 dòng được thêm/thay encoding"""
+
+    def remove(self, student_id):
+        """Xóa 1 sinh viên khỏi index (không có thì bỏ qua)"""
+        with self._lock:
+            position = self._positions.pop(student_id, None)
+            if position is None:
+                return
+
+            last = self._size - 1
+            if position != last:
+                for name in self._ARRAYS:
+                    array = getattr(self, name)
+                    array[position] = array[last]
+                self._positions[int(self._ids[position])] = position
+
+            self._size = last
+
+    def search(self, query_encoding, k=5):
+        """
+        Top-k sinh viên có encoding gần query nhất
+
+        Args:
+            query_encoding: numpy array (128,)
+            k: int
+
+        Returns:
+            list: (student_id, distance) sắp xếp theo distance tăng dần
+        """
+        query = np.asarray(query_encoding, dtype=np.float32)
+
+        with self._lock:
+            if self._size == 0 or k <= 0:
+                return []
+
+            candidates = self._candidates(query, k)
+            if candidates is None:
+                n = self._size
+                sq_distances = self._sq_norms[:n] - 2.0 * (self._encodings[:n] @ query) + query @ query
+            else:
+                sq_distances = self._sq_norms[candidates] - 2.0 * (self._encodings[candidates] @ query) + query @ query
+
+            k = min(k, len(sq_distances))
+            positions = np.argpartition(sq_distances, k - 1)[:k]
+            positions = positions[np.argsort(sq_distances[positions])]
+            sq_distances = sq_distances[positions]
+            if candidates is not None:
+                positions = candidates[positions]
+
+            # Sai số float32 có thể làm bình phương khoảng cách hơi âm khi 2 encoding trùng nhau
+            distances = np.sqrt(np.maximum(sq_distances, 0.0))
+            return [(int(self._ids[position]), float(distance)) for position, distance in zip(positions, distances)]
+
+    def _candidates(self, query, k):
+        """Vị trí các dòng cần tính khoảng cách chính xác, None = toàn bộ (exact search)"""
+        return None
+
+
+class IVFFaceIndex(FaceIndex):
+    """
+    Tìm kiếm gần đúng (IVF) cho số lượng sinh viên rất lớn.
+
+    Encoding được chia vào nlist cụm bằng k-means, mỗi truy vấn chỉ tính khoảng cách chính xác
+    tới các encoding thuộc nprobe cụm gần query nhất (re-rank chính xác trên tập ứng viên, nên
+    distance và ý nghĩa tolerance không đổi; chỉ có thể bỏ sót khi khuôn mặt khớp nằm ở cụm khác).
+    nprobe càng lớn thì recall càng cao và càng chậm, nprobe = nlist tương đương exact search.
+
+    Encoding thêm sau khi build được gán vào cụm gần nhất (không train lại),
+    khi dưới min_train encoding thì dùng exact search.
+    """
+
+    _ARRAYS = FaceIndex._ARRAYS + ('_assign',)
+
+    def __init__(self, ids=None, encodings=None, nlist=None, nprobe=8, min_train=2000, kmeans_iterations=10, seed=0):
+        """
+        Args:
+            ids, encodings: như FaceIndex
+            nlist: int - số cụm, mặc định ~sqrt(N)
+            nprobe: int - số cụm được quét mỗi truy vấn
+            min_train: int - số encoding tối thiểu để dùng IVF
+        """
+        super().__init__(ids, encodings)
+        self.nprobe = nprobe
+        self.centroids = None
+        self._assign = np.zeros(len(self._ids), dtype=np.int32)
+
+        n = self._size
+        if n < min_train:
+            return
+
+        nlist = min(nlist or int(np.sqrt(n)), n)
+        rng = np.random.default_rng(seed)
+        # Train trên mẫu ~32 encoding/cụm là đủ, tránh k-means trên toàn bộ N
+        sample = self._encodings[rng.choice(n, size=min(n, nlist * 32), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+
+        for _ in range(kmeans_iterations):
+            labels = self._nearest_centroid(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            non_empty = counts > 0
+            centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+        self.centroids = centroids
+        self._centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+        self._assign[:n] = self._nearest_centroid(self._encodings[:n], centroids)
+
+    @staticmethod
+    def _nearest_centroid(vectors, centroids, chunk_size=65536):
+        """Cụm gần nhất của từng vector (tính theo khối để giới hạn RAM)"""
+        centroid_sq_norms = np.einsum('ij,ij->i', centroids, centroids)
+        labels = np.empty(len(vectors), dtype=np.int32)
+        for start in range(0, len(vectors), chunk_size):
+            block = vectors[start:start + chunk_size]
+            # ||v||^2 giống nhau cho mọi cụm nên bỏ qua khi lấy argmin
+            labels[start:start + chunk_size] = np.argmin(centroid_sq_norms - 2.0 * (block @ centroids.T), axis=1)
+        return labels
+
+    def _on_row_updated(self, position, encoding):
+        if self.centroids is not None:
+            self._assign[position] = np.argmin(self._centroid_sq_norms - 2.0 * (self.centroids @ encoding))
+
+    def _candidates(self, query, k):
+        if self.centroids is None:
+            return None
+
+        nprobe = min(self.nprobe, len(self.centroids))
+        centroid_distances = self._centroid_sq_norms - 2.0 * (self.centroids @ query)
+        probe = np.zeros(len(self.centroids), dtype=bool)
+        probe[np.argpartition(centroid_distances, nprobe - 1)[:nprobe]] = True
+
+        candidates = np.flatnonzero(probe[self._assign[:self._size]])
+        # Các cụm được quét có quá ít encoding: quét toàn bộ
+        return candidates if len(candidates) >= k else None
+
+
+def build_face_index(ids, encodings):
+    """
+    Tạo index theo APP_CONFIG['face_index']: 'exact' (FaceIndex) hoặc 'ivf' (IVFFaceIndex)
+
+    Args:
+        ids: numpy array int (N,)
+        encodings: numpy array float32 (N, 128)
+
+    Returns:
+        FaceIndex
+    """
+    if APP_CONFIG['face_index'] == 'ivf':
+        return IVFFaceIndex(ids, encodings, nlist=APP_CONFIG['face_index_nlist'] or None,
+                            nprobe=APP_CONFIG['face_index_nprobe'])
+    if APP_CONFIG['face_index'] != 'exact':
+        raise ValueError(f"FACE_INDEX không hợp lệ: {APP_CONFIG['face_index']} (exact | ivf)")
+    return FaceIndex(ids, encodings)
+
+
+_FACE_INDEX = None
+_FACE_INDEX_LOCK = threading.Lock()
+
+# Trạng thái database ở lần đồng bộ gần nhất (xem _sync_face_index)
+_SYNC_STATE = {'state': None, 'checked_at': 0.0}
+
+
+def _on_student_write(action, student_id, student_data):
+    """Áp dụng thay đổi encoding từ StudentDAO vào index (nếu index đã được load)"""
+    index = _FACE_INDEX
+    if index is None:
+        return
+
+    if action == 'delete':
+        index.remove(student_id)
+    elif 'face_encoding' in student_data:
+        index.upsert(student_id, student_data['face_encoding'])
+
+
+def _sync_face_index(index):
+    """
+    Đồng bộ các thay đổi từ máy khác (ghi thẳng vào database, không qua StudentDAO của process này):
+    so sánh COUNT(*), MAX(id), MAX(updated_at) với lần trước, chỉ tải các dòng mới/đã sửa,
+    và chỉ đọc danh sách id khi số lượng lệch: sinh viên bị xóa, hoặc dòng mới bị bỏ sót vì
+    transaction ở máy khác commit sau 1 dòng có id lớn hơn đã được đồng bộ
+    """
+    from ..database.student_dao import StudentDAO
+
+    state = StudentDAO.get_encoding_sync_state()
+    previous = _SYNC_STATE['state']
+    _SYNC_STATE['checked_at'] = time.monotonic()
+    if state is None or state == previous:
+        return
+
+    if previous is not None:
+        changed_ids, changed_encodings = StudentDAO.load_encodings_changed_since(previous['max_id'], previous['updated_at'])
+        for student_id, encoding in zip(changed_ids.tolist(), changed_encodings):
+            index.upsert(student_id, encoding)
+
+        missing_count = 0
+        if len(index) != state['total']:
+            db_ids = StudentDAO.get_ids_with_encodings()
+            index_ids = set(index.ids.tolist())
+            for student_id in index_ids - db_ids:
+                index.remove(student_id)
+            missing_ids, missing_encodings = StudentDAO.load_encodings_by_ids(sorted(db_ids - index_ids))
+            for student_id, encoding in zip(missing_ids.tolist(), missing_encodings):
+                index.upsert(student_id, encoding)
+            missing_count = len(missing_ids)
+        print(f"✓ Face index đồng bộ: {len(changed_ids) + missing_count} thay đổi, {len(index)} sinh viên")
+
+    _SYNC_STATE['state'] = state
+
+
+def get_face_index():
+    """
+    FaceIndex dùng chung:
+    - Lần đầu: load toàn bộ encoding từ database
+    - Các lần ghi qua StudentDAO được cập nhật ngay vào index
+    - Mỗi APP_CONFIG['face_index_sync_interval'] giây kiểm tra thay đổi từ máy khác (1 query nhỏ)
+
+    Returns:
+        FaceIndex
+    """
+    global _FACE_INDEX
+    with _FACE_INDEX_LOCK:
+        if _FACE_INDEX is None:
+            from ..database.student_dao import StudentDAO, add_write_listener
+
+            # Lấy trạng thái trước khi load để thay đổi xảy ra trong lúc load được bắt ở lần đồng bộ sau
+            _SYNC_STATE['state'] = StudentDAO.get_encoding_sync_state()
+            _SYNC_STATE['checked_at'] = time.monotonic()
+            _FACE_INDEX = build_face_index(*StudentDAO.load_encodings())
+            add_write_listener(_on_student_write)
+            print(f"✓ Face index: {len(_FACE_INDEX)} sinh viên")
+
+        elif time.monotonic() - _SYNC_STATE['checked_at'] >= APP_CONFIG['face_index_sync_interval']:
+            try:
+                _sync_face_index(_FACE_INDEX)
+            except Exception as e:
+                print(f"⚠ Lỗi đồng bộ face index: {e}")
+
+        return _FACE_INDEX
+
+
+def invalidate_face_index():
+    """Bỏ index hiện tại, lần tìm kiếm sau sẽ load lại toàn bộ từ database"""
+    global _FACE_INDEX
+    with _FACE_INDEX_LOCK:
+        _FACE_INDEX = None
+
+
+def main():
+    """Đo recall và latency của IVF so với exact search (dữ liệu từ database hoặc ngẫu nhiên)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark face index")
+    parser.add_argument('--synthetic', type=int, default=0, help="Dùng N encoding ngẫu nhiên thay vì database")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--nlist', type=int, default=None)
+    parser.add_argument('--nprobe', type=int, action='append', help="Có thể lặp lại, mặc định 1 4 8 16 32")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    if args.synthetic:
+        # Mỗi "người" có vài ảnh: encoding = tâm + nhiễu nhỏ, giống phân bố encoding dlib
+        people = rng.normal(0, 0.1, (max(1, args.synthetic // 4), ENCODING_DIM))
+        encodings = people[rng.integers(0, len(people), args.synthetic)] + rng.normal(0, 0.03, (args.synthetic, ENCODING_DIM))
+        encodings = encodings.astype(np.float32)
+        ids = np.arange(len(encodings))
+    else:
+        from ..database.db_manager import db_manager
+        from ..database.student_dao import StudentDAO
+        db_manager.connect()
+        ids, encodings = StudentDAO.load_encodings()
+    if not len(ids):
+        parser.error("Không có encoding nào")
+
+    queries = [encodings[i] + rng.normal(0, 0.03, ENCODING_DIM) for i in rng.integers(0, len(ids), args.queries)]
+
+    def run(index):
+        start = time.perf_counter()
+        results = [[student_id for student_id, _ in index.search(query, args.k)] for query in queries]
+        return results, (time.perf_counter() - start) / len(queries) * 1000
+
+    exact, exact_ms = run(FaceIndex(ids, encodings))
+    print(f"exact: {len(ids)} encoding, {exact_ms:.2f} ms/truy vấn")
+
+    start = time.perf_counter()
+    ivf = IVFFaceIndex(ids, encodings, nlist=args.nlist, min_train=0)
+    print(f"ivf: nlist={len(ivf.centroids)}, build {time.perf_counter() - start:.1f}s")
+
+    for nprobe in args.nprobe or [1, 4, 8, 16, 32]:
+        ivf.nprobe = nprobe
+        results, ms = run(ivf)
+        recall = np.mean([len(set(a) & set(b)) / len(b) for a, b in zip(results, exact)])
+        top1 = np.mean([a[:1] == b[:1] for a, b in zip(results, exact)])
+        print(f"  nprobe={nprobe:<4} recall@{args.k}={recall * 100:.1f}%  top1={top1 * 100:.1f}%  {ms:.2f} ms/truy vấn")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,28 @@
 """Face recognition and matching module"""
+import asyncio
 import face_recognition
 import numpy as np
 import cv2
+import os
+import sys
+from .face_detection import detect_faces
+from .face_index import get_face_index
 from ..database.student_dao import StudentDAO
+from ..database.async_dao import AsyncStudentDAO
 
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
 
-def encode_face(image):
+
+def encode_face(image, face_location=None):
     """
     Encode khuôn mặt từ ảnh thành feature vector
     
     Args:
         image: numpy array (BGR image)
+        face_location: tuple (top, right, bottom, left) - vị trí đã biết (vd. từ FaceTracker),
+                       bỏ qua bước detect
     
     Returns:
         numpy array: Face encoding (128-dimensional vector) hoặc None
@@ -18,8 +30,11 @@ def encode_face(image):
     # Convert BGR to RGB
     rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
     
-    # Detect faces
-    face_locations = face_recognition.face_locations(rgb_image, model='hog')
+    # Detect faces (trên ảnh thu nhỏ theo FACE_DETECT_SCALES, encoding vẫn tính trên ảnh gốc)
+    if face_location is not None:
+        face_locations = [face_location]
+    else:
+        face_locations = detect_faces(rgb_image, APP_CONFIG['face_detect_scales'])
     
     if not face_locations:
         return None
@@ -75,39 +90,48 @@ def find_matching_students(query_face_encoding, tolerance=0.5, max_results=5):
     if query_face_encoding is None:
         return []
     
-    # Lấy tất cả students có face encoding
-    students = StudentDAO.get_all_with_encodings()
-    
-    matched_results = []  # Kết quả match thực sự
-    all_results = []      # Tất cả kết quả để so sánh
-    
-    for student in students:
-        if student.get('face_encoding') is None:
-            continue
-        
-        # So sánh
-        match, distance = compare_faces(
-            student['face_encoding'],
-            query_face_encoding,
-            tolerance
-        )
-        
-        result_item = {
-            'student': student,
+    # Top kết quả gần nhất trên toàn bộ sinh viên (đã sắp xếp theo distance tăng dần)
+    top = get_face_index().search(query_face_encoding, k=max(max_results, 2))
+    
+    # Chỉ lấy thông tin của các sinh viên trong kết quả
+    students = StudentDAO.get_by_ids([student_id for student_id, _ in top])
+    
+    return _select_results(top, students, tolerance, max_results)
+
+
+async def find_matching_students_async(query_face_encoding, tolerance=0.5, max_results=5, executor=None):
+    """
+    Như find_matching_students nhưng không chặn event loop: tìm trên face index ở executor
+    (mặc định executor của event loop), lấy thông tin sinh viên qua AsyncStudentDAO
+    """
+    if query_face_encoding is None:
+        return []
+    
+    loop = asyncio.get_running_loop()
+    top = await loop.run_in_executor(
+        executor, lambda: get_face_index().search(query_face_encoding, k=max(max_results, 2))
+    )
+    students = await AsyncStudentDAO.get_by_ids([student_id for student_id, _ in top])
+    
+    return _select_results(top, students, tolerance, max_results)
+
+
+def _select_results(top, students, tolerance, max_results):
+    """
+    Args:
+        top: list (student_id, distance) - sắp xếp theo distance tăng dần
+        students: dict id -> student dict
+    """
+    all_results = [
+        {
+            'student': students[student_id],
             'distance': distance,
-            'match': match
+            'match': distance <= tolerance
         }
-        
-        # Thêm vào all_results để sort
-        all_results.append(result_item)
-        
-        # Chỉ thêm vào matched_results nếu thực sự match
-        if match:
-            matched_results.append(result_item)
-    
-    # Sắp xếp theo distance (tăng dần - càng nhỏ càng giống)
-    matched_results.sort(key=lambda x: x['distance'])
-    all_results.sort(key=lambda x: x['distance'])
+        for student_id, distance in top
+        if student_id in students
+    ]
+    matched_results = [result for result in all_results if result['match']]
     
     # Ưu tiên: trả về các kết quả match thực sự
     if matched_results:
@@ -143,6 +167,17 @@ def search_by_face_image(image, tolerance=0.6, max_results=10):
     return find_matching_students(face_encoding, tolerance, max_results)
 
 
+async def search_by_face_image_async(image, tolerance=0.6, max_results=10):
+    """Như search_by_face_image, encode khuôn mặt ở executor mặc định để không chặn event loop"""
+    loop = asyncio.get_running_loop()
+    face_encoding = await loop.run_in_executor(None, encode_face, image)
+    
+    if face_encoding is None:
+        return []
+    
+    return await find_matching_students_async(face_encoding, tolerance, max_results)
+
+
 def get_similarity_score(distance):
     """
     Chuyển đổi distance thành similarity score (0-100%)
@@ -0,0 +1,253 @@
+"""
+Theo dõi khuôn mặt qua các frame camera (IoU giữa các box HOG) để không nhận diện lại
+cùng 1 người đang đứng trước camera:
+
+- Khi đã có track, chỉ detect trong vùng quanh box cũ thay vì cả frame; cả frame chỉ được
+  quét khi chưa có track hoặc sau full_scan_interval (để thấy người mới bước vào)
+- Encoding + find_matching_students chỉ chạy khi track mới / vừa mất rồi xuất hiện lại,
+  chưa khớp sinh viên nào (thử lại sau retry_interval), hoặc khi kiểm tra định kỳ
+  (verify_interval) thấy encoding đã khác người đã nhận diện
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .face_detection import detect_faces
+
+
+def box_iou(a, b):
+    """IoU của 2 box (top, right, bottom, left)"""
+    top, bottom = max(a[0], b[0]), min(a[2], b[2])
+    left, right = max(a[3], b[3]), min(a[1], b[1])
+    if bottom <= top or right <= left:
+        return 0.0
+    inter = (bottom - top) * (right - left)
+    area_a = (a[2] - a[0]) * (a[1] - a[3])
+    area_b = (b[2] - b[0]) * (b[1] - b[3])
+    return inter / float(area_a + area_b - inter)
+
+
+def _box_area(box):
+    return (box[2] - box[0]) * (box[1] - box[3])
+
+
+def locate_faces(rgb_image, regions=None, upsample=1, scales=(1.0,)):
+    """
+    Detect khuôn mặt (HOG) trên cả ảnh hoặc chỉ trong các vùng cho trước
+
+    Args:
+        rgb_image: numpy array (RGB)
+        regions: list (top, right, bottom, left) hoặc None (cả ảnh)
+        upsample: int - number_of_times_to_upsample của face_recognition
+        scales: tuple float - tỉ lệ thu nhỏ trước khi detect (xem detect_faces)
+
+    Returns:
+        list: box (top, right, bottom, left) trên ảnh gốc, không trùng nhau
+    """
+    if regions is None:
+        return detect_faces(rgb_image, scales, upsample)
+
+    boxes = []
+    for top, right, bottom, left in regions:
+        crop = rgb_image[top:bottom, left:right]
+        if crop.size == 0:
+            continue
+        for t, r, b, l in detect_faces(crop, scales, upsample):
+            box = (t + top, r + left, b + top, l + left)
+            # Vùng của các track gần nhau có thể chồng lên nhau
+            if all(box_iou(box, other) < 0.5 for other in boxes):
+                boxes.append(box)
+    return boxes
+
+
+class FaceTrack:
+    """1 khuôn mặt được theo dõi qua nhiều frame"""
+
+    def __init__(self, track_id, box, now):
+        self.track_id = track_id
+        self.box = box
+        self.first_seen = now
+        self.last_seen = now
+        self.misses = 0             # số lần detect liên tiếp không thấy
+        self.reacquired = False     # vừa mất rồi thấy lại: có thể đã là người khác
+        self.encoding = None        # encoding lần nhận diện gần nhất
+        self.results = None         # kết quả find_matching_students, None = chưa nhận diện
+        self.identified_at = None
+
+    @property
+    def matched(self):
+        """Đã khớp chắc chắn với 1 sinh viên"""
+        return bool(self.results) and self.results[0]['match']
+
+
+class FaceTracker:
+    """
+    Ghép box detect được với các track hiện có theo IoU (tham lam, IoU lớn nhất trước).
+    Track không được ghép quá max_misses lần liên tiếp bị bỏ: người đó xuất hiện lại
+    sẽ là track mới và được nhận diện lại.
+
+    Danh sách track được bảo vệ bằng lock (scan_regions chạy ở worker thread cùng lúc detect),
+    thuộc tính của từng track chỉ được sửa trên 1 thread (thread của event loop).
+    """
+
+    def __init__(self, iou_threshold=0.3, max_misses=2, region_margin=0.5, full_scan_interval=3.0,
+                 retry_interval=2.0, verify_interval=5.0, verify_tolerance=0.5, scales=(1.0,)):
+        """
+        Args:
+            iou_threshold: float - IoU tối thiểu để box thuộc 1 track
+            max_misses: int - số lần detect liên tiếp không thấy trước khi bỏ track
+            region_margin: float - nới vùng detect quanh box cũ (tỉ lệ theo kích thước box, mỗi bên)
+            full_scan_interval: float - giây, quét cả frame định kỳ để thấy người mới
+            retry_interval: float - giây, nhận diện lại track chưa khớp sinh viên nào
+            verify_interval: float - giây, tính lại encoding của track đã nhận diện để kiểm tra
+            verify_tolerance: float - encoding mới cách encoding cũ xa hơn ngưỡng này thì coi là người khác
+            scales: tuple float - tỉ lệ thu nhỏ frame trước khi detect
+        """
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.region_margin = region_margin
+        self.full_scan_interval = full_scan_interval
+        self.retry_interval = retry_interval
+        self.verify_interval = verify_interval
+        self.verify_tolerance = verify_tolerance
+        self.scales = scales
+
+        self._lock = threading.Lock()
+        self._tracks = {}
+        self._next_id = 1
+        self._last_full_scan = 0.0
+
+        # Thống kê: số lần detect theo vùng / cả frame, số lần nhận diện (encoding + tìm kiếm)
+        self.stats = {'region_scans': 0, 'full_scans': 0, 'identifications': 0, 'verifications': 0}
+
+    def reset(self):
+        """Bỏ mọi track (vd. khi tắt camera)"""
+        with self._lock:
+            self._tracks.clear()
+            self._last_full_scan = 0.0
+
+    def scan_regions(self, frame_shape, now=None):
+        """
+        Vùng cần detect ở frame tiếp theo
+
+        Returns:
+            list (top, right, bottom, left) hoặc None nếu cần quét cả frame
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            # Track vừa bị mất có thể đã ra khỏi vùng quanh box cũ
+            lost = any(track.misses for track in self._tracks.values())
+            if not self._tracks or lost or now - self._last_full_scan >= self.full_scan_interval:
+                self._last_full_scan = now
+                self.stats['full_scans'] += 1
+                return None
+
+            height, width = frame_shape[:2]
+            regions = []
+            for track in self._tracks.values():
+                top, right, bottom, left = track.box
+                margin_y = int((bottom - top) * self.region_margin)
+                margin_x = int((right - left) * self.region_margin)
+                regions.append((max(0, top - margin_y), min(width, right + margin_x),
+                                min(height, bottom + margin_y), max(0, left - margin_x)))
+            self.stats['region_scans'] += 1
+            return regions
+
+    def update(self, boxes, now=None):
+        """
+        Ghép các box vừa detect vào track
+
+        Args:
+            boxes: list (top, right, bottom, left)
+
+        Returns:
+            list FaceTrack đang thấy trong frame, lớn nhất trước
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            pairs = sorted(
+                ((box_iou(track.box, box), track_id, i)
+                 for track_id, track in self._tracks.items()
+                 for i, box in enumerate(boxes)),
+                reverse=True
+            )
+            seen, used = set(), set()
+            for iou, track_id, i in pairs:
+                if iou < self.iou_threshold:
+                    break
+                if track_id in seen or i in used:
+                    continue
+                track = self._tracks[track_id]
+                track.box = boxes[i]
+                track.last_seen = now
+                if track.misses:
+                    track.reacquired = True
+                track.misses = 0
+                seen.add(track_id)
+                used.add(i)
+
+            for track_id in [track_id for track_id in self._tracks if track_id not in seen]:
+                track = self._tracks[track_id]
+                track.misses += 1
+                if track.misses > self.max_misses:
+                    del self._tracks[track_id]
+
+            for i, box in enumerate(boxes):
+                if i not in used:
+                    track = FaceTrack(self._next_id, box, now)
+                    self._tracks[track.track_id] = track
+                    self._next_id += 1
+                    seen.add(track.track_id)
+
+            visible = [self._tracks[track_id] for track_id in seen]
+        return sorted(visible, key=lambda track: _box_area(track.box), reverse=True)
+
+    def needs_identify(self, track, now=None):
+        """
+        Returns:
+            'identify' - chưa nhận diện, hoặc chưa khớp ai và đã quá retry_interval
+            'verify' - đã khớp, vừa mất rồi thấy lại hoặc quá verify_interval: tính lại encoding
+                       để kiểm tra còn đúng người
+            None - dùng lại kết quả của track
+        """
+        now = time.time() if now is None else now
+        if track.results is None:
+            return 'identify'
+        if not track.matched:
+            return 'identify' if now - track.identified_at >= self.retry_interval else None
+        if track.reacquired or now - track.identified_at >= self.verify_interval:
+            return 'verify'
+        return None
+
+    def is_same_face(self, track, encoding):
+        """Encoding mới còn là người của track không (so với encoding lần nhận diện trước)"""
+        if track.encoding is None or encoding is None:
+            return False
+        return float(np.linalg.norm(track.encoding - encoding)) <= self.verify_tolerance
+
+    def set_identity(self, track, encoding, results, now=None):
+        """Ghi kết quả nhận diện vào track"""
+        track.encoding = encoding
+        track.results = results
+        track.identified_at = time.time() if now is None else now
+        track.reacquired = False
+        self.stats['identifications'] += 1
+
+    def mark_verified(self, track, now=None):
+        """Kiểm tra định kỳ thấy vẫn đúng người: giữ kết quả, đặt lại thời điểm kiểm tra"""
+        track.identified_at = time.time() if now is None else now
+        track.reacquired = False
+        self.stats['verifications'] += 1
+
+    def detect(self, frame):
+        """
+        Detect khuôn mặt trên frame BGR: quanh các track hiện có, hoặc cả frame khi cần
+        (chạy ở worker thread, không sửa track)
+
+        Returns:
+            list box (top, right, bottom, left)
+        """
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return locate_faces(rgb_frame, self.scan_regions(frame.shape), scales=self.scales)
@@ -0,0 +1,75 @@
+"""Event loop asyncio chạy ở thread nền, phục vụ các cửa sổ Tkinter (tìm kiếm camera, upload ảnh)"""
+import asyncio
+import threading
+import tkinter as tk
+
+
+class AsyncRunner:
+    """
+    1 event loop chạy trong 1 daemon thread. Cửa sổ gửi coroutine qua submit(),
+    kết quả được trả về main thread của Tkinter bằng root.after
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, name='async-runner', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro, root=None, callback=None, error_callback=None):
+        """
+        Chạy coroutine trên event loop
+
+        Args:
+            coro: coroutine
+            root: Tk widget - nếu có, callback/error_callback được gọi trong main thread qua root.after
+            callback: hàm nhận kết quả
+            error_callback: hàm nhận exception (mặc định chỉ in lỗi)
+
+        Returns:
+            concurrent.futures.Future
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+        def on_done(done):
+            if done.cancelled():
+                return
+            error = done.exception()
+            if error is None:
+                handler, value = callback, done.result()
+            else:
+                handler, value = error_callback, error
+                if handler is None:
+                    print(f"Lỗi tác vụ nền: {error}")
+            if handler is None:
+                return
+            if root is None:
+                handler(value)
+            else:
+                try:
+                    root.after(0, handler, value)
+                except (RuntimeError, tk.TclError):
+                    pass  # cửa sổ đã đóng
+
+        future.add_done_callback(on_done)
+        return future
+
+    def stop(self):
+        """Dừng event loop"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_async_runner():
+    """Event loop dùng chung cho toàn ứng dụng (tạo ở lần gọi đầu)"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner()
+        return _runner
@@ -4,13 +4,9 @@ from tkinter import filedialog, messagebox
 import cv2
 import os
 import threading
-from datetime import datetime
 from PIL import Image, ImageTk
 import numpy as np
-from ..image_processing.card_detector import detect_and_extract_card
-from ..extraction.ocr_extractor import extract_student_info
-from ..extraction.face_extractor import extract_face_region, get_face_encoding_from_card
-from ..face_matching.face_matcher import encode_face
+from ..extraction.card_pipeline import process_card, save_student, count_fields
 from ..database.student_dao import StudentDAO
 
 
@@ -460,72 +456,8 @@ class ExtractWindow:
     def _extract_info_thread(self):
         """Extract info in background thread"""
         try:
-            # Detect and extract card
-            card_extracted, success = detect_and_extract_card(self.card_image)
-            
-            if not success:
-                card_extracted = self.card_image  # Use original if detection fails
-                print("⚠ Card detection failed, using original image")
-            else:
-                print("✓ Card detection successful")
-            
-            # Extract text info - thử với ảnh đã detect trước
-            self.extracted_info = extract_student_info(card_extracted)
-            
-            # Nếu không trích xuất được thông tin, thử với ảnh gốc
-            extracted_count = sum(1 for k in ['mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han'] 
-                                 if self.extracted_info.get(k))
-            
-            if extracted_count < 2 and success:  # Nếu ít hơn 2 field và detection đã thành công
-                print("⚠ Low extraction rate, trying with original image...")
-                original_info = extract_student_info(self.card_image)
-                original_count = sum(1 for k in ['mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han'] 
-                                    if original_info.get(k))
-                
-                # Nếu ảnh gốc cho kết quả tốt hơn, dùng nó
-                if original_count > extracted_count:
-                    print(f"✓ Using original image (extracted {original_count} fields vs {extracted_count})")
-                    self.extracted_info = original_info
-                    card_extracted = self.card_image
-            
-            # Debug: Print extracted info
-            print("=== Extracted Info ===")
-            for key, value in self.extracted_info.items():
-                if key != 'raw_text':
-                    print(f"{key}: {value}")
-            print("======================")
-            
-            # Extract face
-            self.extracted_info['face_image'] = None
-            self.extracted_info['face_encoding'] = None
-            
-            # Try to extract face from detected card first
-            print("🔍 Trying to extract face from detected card...")
-            face_image, face_location = extract_face_region(
-                card_extracted,
-                padding=30  # Tăng padding để lấy đủ phần đầu và cổ
-            )
-            
-            # Nếu không tìm thấy trên ảnh đã detect, thử trên ảnh gốc
-            if face_image is None:
-                print("⚠ No face found in detected card, trying original image...")
-                face_image, face_location = extract_face_region(
-                    self.card_image,
-                    padding=30  # Tăng padding để lấy đủ phần đầu và cổ
-                )
-            
-            if face_image is not None:
-                print(f"✓ Face extracted successfully! Size: {face_image.shape}")
-                self.extracted_info['face_image'] = face_image
-                # Get face encoding
-                face_encoding = get_face_encoding_from_card(card_extracted)
-                if face_encoding is None:
-                    # Thử với ảnh gốc nếu không tìm thấy trên card detected
-                    face_encoding = get_face_encoding_from_card(self.card_image)
-                
-                if face_encoding is not None:
-                    self.extracted_info['face_encoding'] = face_encoding
-                    print("✓ Face encoding generated")
+            self.extracted_info = process_card(self.card_image)
+            face_image = self.extracted_info['face_image']
             
             # Update UI in main thread
             self.root.after(0, self._update_ui_after_extraction, face_image)
@@ -575,8 +507,7 @@ class ExtractWindow:
                 self.status_callback("Trích xuất thông tin thành công")
             
             # Show info about what was extracted
-            extracted_count = sum(1 for k in ['mssv', 'ho_ten', 'ngay_sinh', 'nien_khoa', 'ngay_het_han'] 
-                                 if self.extracted_info.get(k))
+            extracted_count = count_fields(self.extracted_info)
             messagebox.showinfo(
                 "Thành công", 
                 f"Đã trích xuất {extracted_count}/5 trường thông tin từ thẻ.\n"
@@ -716,30 +647,18 @@ class ExtractWindow:
                 return
         
         try:
-            # Save face image
-            avatar_path = None
-            if self.extracted_info.get('face_image') is not None:
-                mssv = student_data['mssv']
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                avatar_filename = f"{mssv}_{timestamp}.jpg"
-                avatar_path = os.path.join(self.avatars_dir, avatar_filename)
-                cv2.imwrite(avatar_path, self.extracted_info['face_image'])
-                student_data['avatar_path'] = avatar_path
-            
-            # Add face encoding
-            if self.extracted_info.get('face_encoding') is not None:
-                student_data['face_encoding'] = self.extracted_info['face_encoding']
-            
-            # Save to database
+            student_id = save_student(
+                student_data,
+                face_image=self.extracted_info.get('face_image'),
+                face_encoding=self.extracted_info.get('face_encoding'),
+                existing=existing,
+                avatars_dir=self.avatars_dir
+            )
+            
             if existing:
-                # Update
-                StudentDAO.update(existing['id'], student_data)
                 messagebox.showinfo("Thành công", "Đã cập nhật thông tin sinh viên")
-            else:
-                # Insert
-                student_id = StudentDAO.create(student_data)
-                if student_id:
-                    messagebox.showinfo("Thành công", f"Đã lưu sinh viên với ID: {student_id}")
+            elif student_id:
+                messagebox.showinfo("Thành công", f"Đã lưu sinh viên với ID: {student_id}")
             
             if self.status_callback:
                 self.status_callback("Đã lưu vào database")
@@ -0,0 +1,105 @@
+"""Lập lịch xử lý frame camera trên event loop nền: giữ frame mới nhất, bỏ frame cũ"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class LatestFrameScheduler:
+    """
+    Xử lý frame camera với số worker cố định:
+    - Khi mọi worker đang bận, frame mới thay frame đang chờ trong 1 slot duy nhất
+      (frame cũ chưa xử lý bị bỏ), nên RAM và CPU không tăng theo tốc độ camera
+    - Kết quả chỉ được trả về theo thứ tự frame: kết quả của frame cũ hơn frame đã trả về bị bỏ
+    - Khi có kết quả mới, các tác vụ của frame cũ hơn đang chạy bị hủy (bước tiếp theo không chạy)
+
+    Mọi trạng thái chỉ được đọc/ghi trên thread của event loop.
+    """
+
+    def __init__(self, runner, process, on_result, workers=1):
+        """
+        Args:
+            runner: AsyncRunner - event loop nền
+            process: coroutine function (frame, executor) -> kết quả; phần tốn CPU chạy trên
+                     executor (loop.run_in_executor(executor, ...)) để giới hạn số thread
+            on_result: hàm (kết quả, frame), gọi trên thread của event loop
+            workers: int - số frame được xử lý cùng lúc
+        """
+        self.runner = runner
+        self.process = process
+        self.on_result = on_result
+        self.workers = max(1, workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='frame-worker')
+
+        self._sequence = 0
+        self._pending = None        # (seq, frame) chờ worker rảnh
+        self._running = {}          # seq -> asyncio.Task
+        self._delivered = 0         # seq của kết quả mới nhất đã trả về
+        self.dropped = 0            # số frame bị bỏ vì có frame mới hơn
+        self._closed = False        # đã shutdown: không nhận frame, không trả kết quả nữa
+
+    def submit(self, frame):
+        """Gửi 1 frame (gọi được từ thread bất kỳ, vd. thread đọc camera)"""
+        self.runner.loop.call_soon_threadsafe(self._offer, frame)
+
+    def cancel(self):
+        """Bỏ frame đang chờ, hủy các tác vụ đang chạy và bỏ mọi kết quả của chúng (vd. khi tắt camera)"""
+        self.runner.loop.call_soon_threadsafe(self._cancel_all)
+
+    def _offer(self, frame):
+        # Frame được gửi trước shutdown nhưng tới loop sau đó
+        if self._closed:
+            return
+        self._sequence += 1
+        if len(self._running) < self.workers:
+            self._start(self._sequence, frame)
+        else:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = (self._sequence, frame)
+
+    def _start(self, seq, frame):
+        if self._closed:
+            return
+        task = asyncio.ensure_future(self.process(frame, self.executor))
+        self._running[seq] = task
+        task.add_done_callback(lambda done: self._finished(seq, frame, done))
+
+    def _finished(self, seq, frame, task):
+        self._running.pop(seq, None)
+
+        if not task.cancelled():
+            error = task.exception()
+            if error is not None:
+                print(f"Lỗi xử lý frame: {error}")
+            elif seq > self._delivered and not self._closed:
+                self._delivered = seq
+                # Frame cũ hơn đang chạy không còn cần nữa
+                for old_seq, old_task in list(self._running.items()):
+                    if old_seq < seq:
+                        old_task.cancel()
+                self.on_result(task.result(), frame)
+
+        if self._pending is not None and len(self._running) < self.workers:
+            pending_seq, pending_frame = self._pending
+            self._pending = None
+            if pending_seq > self._delivered:
+                self._start(pending_seq, pending_frame)
+
+    def _cancel_all(self):
+        self._pending = None
+        self._delivered = self._sequence
+        for task in list(self._running.values()):
+            task.cancel()
+
+    def shutdown(self):
+        """Hủy mọi tác vụ và dừng các worker thread (gọi được từ thread bất kỳ, vd. khi đóng cửa sổ)"""
+        # Đặt ngay (không chờ loop): on_result không được gọi nữa sau khi hàm này trả về,
+        # vd. khi cửa sổ Tk đã bị hủy
+        self._closed = True
+        asyncio.run_coroutine_threadsafe(self._close(), self.runner.loop)
+
+    async def _close(self):
+        tasks = list(self._running.values())
+        self._cancel_all()
+        # Dừng executor sau khi các tác vụ đã kết thúc hẳn, để không tác vụ nào gửi việc vào executor đã tắt
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.executor.shutdown(wait=False)
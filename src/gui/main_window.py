@@ -1,9 +1,14 @@
 """Main GUI window - Modern Design"""
 import tkinter as tk
 from tkinter import ttk, messagebox
-from .extract_window import ExtractWindow
-from .search_window import SearchWindow
-from ..database.student_dao import StudentDAO
+import sys
+import os
+from ..database.async_dao import AsyncStudentDAO
+from .paged_tree import PagedTreeLoader
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
 
 
 class MainWindow:
@@ -38,6 +43,10 @@ class MainWindow:
         # Create UI
         self.create_widgets()
         
+        # Load model OCR/khuôn mặt ở thread nền, cửa sổ hiện ngay không phải chờ
+        if APP_CONFIG['warmup']:
+            self.start_warmup()
+        
         # Connect to database
         try:
             from ..database.db_manager import db_manager
@@ -46,6 +55,8 @@ class MainWindow:
                     "Lỗi kết nối",
                     "Không thể kết nối đến database. Vui lòng kiểm tra cấu hình."
                 )
+            elif APP_CONFIG['db_auto_migrate']:
+                self.start_migration()
         except Exception as e:
             messagebox.showerror("Lỗi", f"Lỗi khởi tạo: {str(e)}")
     
@@ -163,14 +174,14 @@ class MainWindow:
         status_container = tk.Frame(status_frame, bg=self.COLORS['dark'])
         status_container.pack(expand=True)
         
-        status_icon = tk.Label(
+        self.status_icon = tk.Label(
             status_container,
             text="●",
             font=("Arial", 10),
             bg=self.COLORS['dark'],
             fg=self.COLORS['success']
         )
-        status_icon.pack(side=tk.LEFT, padx=(10, 5))
+        self.status_icon.pack(side=tk.LEFT, padx=(10, 5))
         
         self.status_label = tk.Label(
             status_container,
@@ -272,13 +283,51 @@ class MainWindow:
         
         return card
     
+    def start_warmup(self):
+        """Warm-up model ở thread nền, trạng thái hiển thị trên status bar"""
+        from ..extraction.warmup import start_warmup
+        
+        def on_status(message, ready):
+            # Callback chạy ở thread nền, cập nhật Tk phải qua main thread
+            self.root.after(0, self.update_status, message, ready)
+        
+        self.update_status("Đang tải model...", ready=False)
+        start_warmup(on_status)
+    
+    def start_migration(self):
+        """
+        Chạy migration database ở thread nền: ALTER TABLE / tạo index trên bảng lớn có thể mất
+        vài phút, cửa sổ vẫn dùng được, trạng thái hiển thị trên status bar
+        """
+        import threading
+        from ..database.migrations import migrate, pending_migrations
+        
+        def run():
+            try:
+                if not pending_migrations():
+                    return
+                self.root.after(0, self.update_status, "Đang cập nhật cấu trúc database...", False)
+                applied = migrate()
+                message = f"✓ Đã cập nhật database (migration {applied})" if applied else "✓ Database đã cập nhật"
+                print(message)
+                self.root.after(0, self.update_status, message, True)
+            except Exception as e:
+                print(f"⚠ Lỗi migrate database: {e}")
+                self.root.after(0, self.update_status,
+                                f"⚠ Lỗi cập nhật database: {e} (chạy: python -m src.database.migrations)", True)
+        
+        threading.Thread(target=run, name="db-migrate", daemon=True).start()
+    
     def open_extract_window(self):
         """Open extract window"""
+        # Import khi cần: kéo theo torch, vietocr, dlib, cv2
+        from .extract_window import ExtractWindow
         extract_window = tk.Toplevel(self.root)
         ExtractWindow(extract_window, self.update_status)
     
     def open_search_window(self):
         """Open search window"""
+        from .search_window import SearchWindow
         search_window = tk.Toplevel(self.root)
         SearchWindow(search_window, self.update_status)
     
@@ -374,10 +423,21 @@ class MainWindow:
         v_scrollbar.config(command=tree.yview)
         h_scrollbar.config(command=tree.xview)
         
-        # Load data
-        try:
-            students = StudentDAO.get_all()
-            if not students:
+        # Configure row colors
+        tree.tag_configure("evenrow", background=self.COLORS['white'])
+        tree.tag_configure("oddrow", background=self.COLORS['light'])
+        
+        def row_item(student):
+            return str(student['id']), (
+                student.get('mssv', ''),
+                student.get('ho_ten', ''),
+                str(student.get('ngay_sinh', '')) if student.get('ngay_sinh') else '',
+                student.get('nien_khoa', ''),
+                str(student.get('ngay_het_han', '')) if student.get('ngay_het_han') else ''
+            )
+        
+        def on_loaded(count, done):
+            if count == 0 and done:
                 empty_label = tk.Label(
                     content,
                     text="📭 Chưa có sinh viên nào trong hệ thống",
@@ -386,30 +446,31 @@ class MainWindow:
                     fg=self.COLORS['text_light']
                 )
                 empty_label.pack(expand=True)
-            else:
-                for idx, student in enumerate(students):
-                    tag = "evenrow" if idx % 2 == 0 else "oddrow"
-                    tree.insert(
-                        "",
-                        tk.END,
-                        text=str(student['id']),
-                        values=(
-                            student.get('mssv', ''),
-                            student.get('ho_ten', ''),
-                            str(student.get('ngay_sinh', '')) if student.get('ngay_sinh') else '',
-                            student.get('nien_khoa', ''),
-                            str(student.get('ngay_het_han', '')) if student.get('ngay_het_han') else ''
-                        ),
-                        tags=(tag,)
-                    )
-                
-                # Configure row colors
-                tree.tag_configure("evenrow", background=self.COLORS['white'])
-                tree.tag_configure("oddrow", background=self.COLORS['light'])
-        except Exception as e:
-            messagebox.showerror("Lỗi", f"Không thể tải dữ liệu: {str(e)}")
+        
+        def on_error(error):
+            messagebox.showerror("Lỗi", f"Không thể tải dữ liệu: {str(error)}", parent=view_window)
+        
+        # Load data: từng trang khi cuộn xuống, không tải toàn bộ bảng khi mở cửa sổ
+        PagedTreeLoader(
+            tree,
+            v_scrollbar,
+            AsyncStudentDAO.get_page,
+            row_item,
+            page_size=APP_CONFIG['student_list_page_size'],
+            on_loaded=on_loaded,
+            on_error=on_error
+        )
     
-    def update_status(self, message):
-        """Update status bar"""
+    def update_status(self, message, ready=None):
+        """
+        Update status bar
+        
+        Args:
+            message: str
+            ready: bool - đổi màu chấm trạng thái (False: đang tải model, True: sẵn sàng),
+                   None thì giữ nguyên
+        """
+        if ready is not None:
+            self.status_icon.config(fg=self.COLORS['success'] if ready else self.COLORS['warning'])
         self.status_label.config(text=message)
         self.root.update_idletasks()
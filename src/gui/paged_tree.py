@@ -0,0 +1,82 @@
+"""Treeview được điền dần theo trang khi người dùng cuộn tới gần cuối danh sách"""
+import tkinter as tk
+
+from .async_runner import get_async_runner
+
+
+class PagedTreeLoader:
+    """
+    Gắn vào 1 ttk.Treeview: tải trang đầu ngay, các trang sau được tải trên event loop nền
+    khi thanh cuộn xuống quá load_threshold, nên cửa sổ mở ngay dù bảng có bao nhiêu dòng
+    """
+
+    def __init__(self, tree, scrollbar, fetch_page, row_item, page_size=200, load_threshold=0.9,
+                 on_loaded=None, on_error=None):
+        """
+        Args:
+            tree: ttk.Treeview
+            scrollbar: ttk.Scrollbar dọc của tree
+            fetch_page: coroutine function (after, page_size) -> (rows, cursor trang sau hoặc None)
+            row_item: hàm row -> (text, values) để insert vào tree
+            page_size: int - số dòng mỗi trang
+            load_threshold: float - vị trí thanh cuộn (0-1) bắt đầu tải trang tiếp
+            on_loaded: hàm (số dòng đã tải, đã hết hay chưa) sau mỗi trang
+            on_error: hàm nhận exception khi tải lỗi
+        """
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.fetch_page = fetch_page
+        self.row_item = row_item
+        self.page_size = page_size
+        self.load_threshold = load_threshold
+        self.on_loaded = on_loaded
+        self.on_error = on_error
+
+        self.cursor = None
+        self.loaded = 0
+        self.loading = False
+        self.done = False
+
+        tree.configure(yscrollcommand=self._on_scroll)
+        self.load_more()
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        # Tk gọi lại sau mỗi lần insert: nếu danh sách chưa lấp đầy khung nhìn (last = 1.0)
+        # thì tự tải tiếp cho tới khi có thanh cuộn
+        if float(last) >= self.load_threshold:
+            self.load_more()
+
+    def load_more(self):
+        """Tải trang tiếp theo (bỏ qua nếu đang tải hoặc đã hết)"""
+        if self.loading or self.done:
+            return
+        self.loading = True
+        get_async_runner().submit(
+            self.fetch_page(self.cursor, self.page_size),
+            root=self.tree,
+            callback=self._append,
+            error_callback=self._failed
+        )
+
+    def _append(self, page):
+        if not self.tree.winfo_exists():
+            return  # cửa sổ đã đóng trong lúc tải
+
+        rows, self.cursor = page
+        for row in rows:
+            text, values = self.row_item(row)
+            tag = "evenrow" if self.loaded % 2 == 0 else "oddrow"
+            self.tree.insert("", tk.END, text=text, values=values, tags=(tag,))
+            self.loaded += 1
+
+        self.done = self.cursor is None
+        self.loading = False
+        if self.on_loaded:
+            self.on_loaded(self.loaded, self.done)
+
+    def _failed(self, error):
+        self.done = True
+        self.loading = False
+        if self.on_error and self.tree.winfo_exists():
+            self.on_error(error)
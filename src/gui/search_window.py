@@ -1,4 +1,5 @@
 """Search window for face-based student search with real-time camera"""
+import asyncio
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import cv2
@@ -6,8 +7,18 @@ import os
 import threading
 from PIL import Image, ImageTk
 import numpy as np
-from ..face_matching.face_matcher import search_by_face_image, get_similarity_score, encode_face
-import face_recognition
+from ..face_matching.face_matcher import (
+    search_by_face_image_async, find_matching_students_async, get_similarity_score, encode_face
+)
+from ..face_matching.face_detection import detect_faces
+from ..face_matching.face_tracker import FaceTracker
+from .async_runner import get_async_runner
+from .frame_scheduler import LatestFrameScheduler
+import sys
+
+# Add config directory to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
+from config.app import APP_CONFIG
 
 
 class SearchWindow:
@@ -50,6 +61,21 @@ class SearchWindow:
         self.camera_lock = threading.Lock()  # Lock for camera operations
         self.updating_preview = False  # Flag to prevent concurrent updates
         
+        # Event loop nền cho tìm kiếm (camera + upload): không tạo thread mới cho mỗi lần tìm
+        self.async_runner = get_async_runner()
+        
+        # Theo dõi khuôn mặt qua các frame: cùng 1 người không bị encode + tìm kiếm lại mỗi giây
+        self.face_tracker = FaceTracker(scales=APP_CONFIG['face_detect_scales'])
+        self.displayed_track_id = None
+        
+        # Tìm kiếm tự động từ camera: số worker cố định, chỉ giữ frame mới nhất khi worker đang bận
+        self.search_scheduler = LatestFrameScheduler(
+            self.async_runner,
+            self.auto_search_face,
+            self.on_auto_search_result,
+            workers=APP_CONFIG['camera_search_workers']
+        )
+        
         self.create_widgets()
         
         # Cleanup when window closes
@@ -379,6 +405,11 @@ class SearchWindow:
         with self.camera_lock:
             self.camera_active = False
         
+        # Bỏ frame đang chờ và kết quả của các lần tìm kiếm đang chạy
+        self.search_scheduler.cancel()
+        self.face_tracker.reset()
+        self.displayed_track_id = None
+        
         # Wait a bit for thread to stop
         if self.camera_thread and self.camera_thread.is_alive():
             import time
@@ -447,12 +478,8 @@ class SearchWindow:
                     if self.auto_search_var.get():
                         if current_time - self.last_face_detection_time >= self.face_detection_interval:
                             self.last_face_detection_time = current_time
-                            # Search in separate thread to avoid blocking
-                            threading.Thread(
-                                target=self.auto_search_face, 
-                                args=(frame.copy(),), 
-                                daemon=True
-                            ).start()
+                            # Search on the background event loop (frame cũ đang chờ sẽ bị thay)
+                            self.search_scheduler.submit(frame.copy())
                     
                     # Small delay to control frame rate
                     time.sleep(0.03)  # ~30 FPS for capture
@@ -490,10 +517,10 @@ class SearchWindow:
             # Detect faces for visualization (lightweight)
             try:
                 rgb_frame = cv2.cvtColor(display_frame, cv2.COLOR_BGR2RGB)
-                face_locations = face_recognition.face_locations(
-                    rgb_frame, 
-                    model='hog', 
-                    number_of_times_to_upsample=0
+                face_locations = detect_faces(
+                    rgb_frame,
+                    APP_CONFIG['face_detect_scales'],
+                    upsample=0
                 )
                 
                 # Draw rectangles around detected faces
@@ -560,30 +587,74 @@ class SearchWindow:
         finally:
             self.updating_preview = False
     
-    def auto_search_face(self, frame):
-        """Auto-search for faces in frame"""
+    async def auto_search_face(self, frame, executor):
+        """
+        Auto-search for faces in frame (coroutine, chạy bởi search_scheduler)
+        
+        Returns:
+            tuple (track_id, list kết quả), hoặc None nếu không cần cập nhật kết quả đang hiển thị
+            (camera đã tắt / không có khuôn mặt / vẫn là người đang hiển thị)
+        """
         if not self.camera_active:
-            return
+            return None
         
         try:
-            # Encode face
-            face_encoding = encode_face(frame)
+            # Detect trên worker của scheduler, chỉ quanh khuôn mặt đang theo dõi nếu có
+            loop = asyncio.get_running_loop()
+            boxes = await loop.run_in_executor(executor, self.face_tracker.detect, frame)
+            tracks = self.face_tracker.update(boxes)
+            
+            if not tracks:
+                return None
+            
+            # Khuôn mặt lớn nhất (gần camera nhất) là người cần tìm
+            track = tracks[0]
+            action = self.face_tracker.needs_identify(track)
+            
+            if action is None:
+                # Cùng người: dùng lại kết quả, chỉ hiển thị lại khi đổi sang track khác
+                if track.track_id == self.displayed_track_id:
+                    return None
+                return track.track_id, track.results
+            
+            # Encode đúng vị trí của track (không detect lại)
+            face_encoding = await loop.run_in_executor(executor, encode_face, frame, track.box)
             
             if face_encoding is None:
-                return
+                return None
             
-            # Search for matching students (tolerance 0.5 - chặt chẽ hơn)
-            results = search_by_face_image(frame, tolerance=0.5, max_results=5)
+            if action == 'verify' and self.face_tracker.is_same_face(track, face_encoding):
+                self.face_tracker.mark_verified(track)
+                if track.track_id == self.displayed_track_id:
+                    return None
+                return track.track_id, track.results
             
-            # Update results in main thread
+            # Search for matching students bằng encoding vừa tính (tolerance 0.5 - chặt chẽ hơn)
+            results = await find_matching_students_async(face_encoding, tolerance=0.5, max_results=5,
+                                                          executor=executor)
+            self.face_tracker.set_identity(track, face_encoding, results)
+            return track.track_id, results
+                
+        except Exception as e:
+            print(f"Error in auto search: {e}")
+            return None
+    
+    def on_auto_search_result(self, result, frame):
+        """Kết quả mới nhất từ search_scheduler (gọi trên thread của event loop)"""
+        if result is None:
+            return
+        
+        self.displayed_track_id, results = result
+        
+        # Update results in main thread (cửa sổ có thể vừa bị đóng)
+        try:
             if results:
-                self.root.after(0, self.update_search_results, results, frame.copy())
+                self.root.after(0, self.update_search_results, results, frame)
             else:
                 # Clear results if no match found
                 self.root.after(0, self.clear_results)
-                
-        except Exception as e:
-            print(f"Error in auto search: {e}")
+        except (RuntimeError, tk.TclError):
+            pass
     
     def update_search_results(self, results, frame):
         """Update search results display"""
@@ -682,9 +753,9 @@ class SearchWindow:
         self.search_image = image.copy()
         
         # Search immediately
-        threading.Thread(target=self.search_students_async, daemon=True).start()
+        self.async_runner.submit(self.search_students_async())
     
-    def search_students_async(self):
+    async def search_students_async(self):
         """Search students asynchronously"""
         if self.search_image is None:
             return
@@ -692,7 +763,7 @@ class SearchWindow:
         self.root.after(0, self.update_status, "Đang tìm kiếm...")
         
         try:
-            results = search_by_face_image(self.search_image, tolerance=0.5, max_results=5)
+            results = await search_by_face_image_async(self.search_image, tolerance=0.5, max_results=5)
             self.search_results = results
             
             self.root.after(0, self.display_uploaded_results, results)
@@ -834,6 +905,8 @@ Thẻ có giá trị đến: {student.get('ngay_het_han', 'N/A')}
         except Exception as e:
             print(f"Error stopping camera on close: {e}")
         
+        self.search_scheduler.shutdown()
+        
         # Give time for cleanup
         import time
         time.sleep(0.1)
@@ -1,6 +1,7 @@
 import math
 import torch
 from torch import nn
+from torch.nn import functional as F
 
 class LanguageTransformer(nn.Module):
     def __init__(self, vocab_size, 
@@ -61,6 +62,108 @@ class LanguageTransformer(nn.Module):
         output = output.transpose(0, 1)
 
         return self.fc(output), memory
+
+    def init_decoder_cache(self, memory):
+        """
+        Tạo cache cho incremental decoding: key/value của cross-attention
+        được chiếu sẵn từ memory một lần, key/value của self-attention
+        được nối dần sau mỗi bước.
+
+        Shape:
+            - memory: (S, N, E)
+            - cache['layers'][i]['mem_k'], ['mem_v']: (N, H, S, E/H)
+        """
+        layers = []
+        for layer in self.transformer.decoder.layers:
+            mem_k, mem_v = self.project_memory(layer, memory)
+            layers.append({'k': None, 'v': None, 'mem_k': mem_k, 'mem_v': mem_v})
+
+        return {'step': 0, 'layers': layers}
+
+    def forward_decoder_step(self, tgt, cache):
+        """
+        Decode đúng 1 token mới, dùng lại key/value đã cache của các bước trước.
+        Kết quả tương đương forward_decoder() ở vị trí cuối nhưng mỗi bước
+        chỉ tốn O(T) thay vì chạy lại toàn bộ chuỗi.
+
+        Shape:
+            - tgt: (N,) token vừa sinh ở bước trước
+            - output: (N, V)
+        """
+        step = cache['step']
+        x = self.embed_tgt(tgt).unsqueeze(0) * math.sqrt(self.d_model)
+        x = self.pos_enc(x, offset=step)
+
+        for layer, layer_cache in zip(self.transformer.decoder.layers, cache['layers']):
+            x, layer_cache['k'], layer_cache['v'] = self.decoder_layer_step(
+                layer, x, layer_cache['k'], layer_cache['v'], layer_cache['mem_k'], layer_cache['mem_v'])
+
+        if self.transformer.decoder.norm is not None:
+            x = self.transformer.decoder.norm(x)
+
+        cache['step'] = step + 1
+        return self.fc(x[0])
+
+    @classmethod
+    def project_memory(cls, layer, memory):
+        """Key/value cross-attention của 1 decoder layer, chiếu từ memory (S, N, E) -> (N, H, S, E/H)"""
+        attn = layer.multihead_attn
+        _, w_k, w_v = attn.in_proj_weight.chunk(3)
+        b_k = b_v = None
+        if attn.in_proj_bias is not None:
+            _, b_k, b_v = attn.in_proj_bias.chunk(3)
+
+        return (cls._split_heads(F.linear(memory, w_k, b_k), attn.num_heads),
+                cls._split_heads(F.linear(memory, w_v, b_v), attn.num_heads))
+
+    @classmethod
+    def decoder_layer_step(cls, layer, x, k, v, mem_k, mem_v):
+        """
+        1 bước của 1 TransformerDecoderLayer (post-norm) cho token mới x (1, N, E).
+        k, v: cache self-attention (N, H, T, E/H) hoặc None ở bước đầu.
+        Trả về (x, k, v) với k, v đã nối thêm token mới.
+        """
+        self_attn = layer.self_attn
+        q, new_k, new_v = F.linear(x, self_attn.in_proj_weight, self_attn.in_proj_bias).chunk(3, dim=-1)
+        new_k = cls._split_heads(new_k, self_attn.num_heads)
+        new_v = cls._split_heads(new_v, self_attn.num_heads)
+        k = new_k if k is None else torch.cat([k, new_k], dim=2)
+        v = new_v if v is None else torch.cat([v, new_v], dim=2)
+
+        sa = cls._attend(cls._split_heads(q, self_attn.num_heads), k, v, self_attn)
+        x = layer.norm1(x + sa)
+
+        cross_attn = layer.multihead_attn
+        w_q, _, _ = cross_attn.in_proj_weight.chunk(3)
+        b_q = cross_attn.in_proj_bias.chunk(3)[0] if cross_attn.in_proj_bias is not None else None
+        q = cls._split_heads(F.linear(x, w_q, b_q), cross_attn.num_heads)
+        ca = cls._attend(q, mem_k, mem_v, cross_attn)
+        x = layer.norm2(x + ca)
+
+        x = layer.norm3(x + layer.linear2(layer.activation(layer.linear1(x))))
+
+        return x, k, v
+
+    def select_decoder_cache(self, cache, index):
+        """Giữ lại các hàng index (LongTensor) của batch trong cache, dùng khi loại các chuỗi đã xong"""
+        for layer_cache in cache['layers']:
+            for key in ('k', 'v', 'mem_k', 'mem_v'):
+                if layer_cache[key] is not None:
+                    layer_cache[key] = layer_cache[key].index_select(0, index)
+        return cache
+
+    @staticmethod
+    def _split_heads(x, num_heads):
+        """(T, N, E) -> (N, H, T, E/H)"""
+        return x.view(x.size(0), x.size(1), num_heads, -1).permute(1, 2, 0, 3)
+
+    @staticmethod
+    def _attend(q, k, v, attn):
+        """Scaled dot-product attention trên các head đã tách, trả về (1, N, E)"""
+        scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(q.size(-1))
+        out = torch.matmul(torch.softmax(scores, dim=-1), v)
+        out = out.permute(2, 0, 1, 3).flatten(2)
+        return attn.out_proj(out)
     
     def expand_memory(self, memory, beam_size):
         memory = memory.repeat(1, beam_size, 1)
@@ -83,8 +186,8 @@ class PositionalEncoding(nn.Module):
         pe = pe.unsqueeze(0).transpose(0, 1)
         self.register_buffer('pe', pe)
 
-    def forward(self, x):
-        x = x + self.pe[:x.size(0), :]
+    def forward(self, x, offset=0):
+        x = x + self.pe[offset:offset + x.size(0), :]
 
         return self.dropout(x)
  
@@ -3,10 +3,32 @@ from torch import nn
 from torchvision import models
 
 
+def _torchvision_vgg19_bn(pretrained):
+    """
+    pretrained=True: weights ImageNet, False: khởi tạo ngẫu nhiên,
+    None: không khởi tạo gì (weights sẽ được load_state_dict ngay sau đó)
+    """
+    if pretrained is None:
+        try:
+            # Tạo trên meta device để bỏ qua random init ~140M tham số (phần lớn ở classifier không dùng)
+            with torch.device('meta'):
+                cnn = models.vgg19_bn(weights=None)
+            cnn.features.to_empty(device='cpu')
+            return cnn
+        except (AttributeError, TypeError):
+            # torch < 2.0
+            pretrained = False
+
+    if hasattr(models, 'VGG19_BN_Weights'):
+        return models.vgg19_bn(weights=models.VGG19_BN_Weights.IMAGENET1K_V1 if pretrained else None)
+    # torchvision < 0.13
+    return models.vgg19_bn(pretrained=pretrained)
+
+
 class Vgg(nn.Module):
     def __init__(self, name, ss, ks, hidden, pretrained=True, dropout=0.5):
         super(Vgg, self).__init__()
-        cnn = models.vgg19_bn(pretrained=pretrained)
+        cnn = _torchvision_vgg19_bn(pretrained)
 
         pool_idx = 0
         
@@ -1,13 +1,15 @@
-from PIL import Image
+import os
 import yaml
 
 from src.vietocr.tool.predictor import Predictor
-from src.config import text_recognition
+from config.ocr import OCR_CONFIG, text_recognition
 
 
 class TextRecognition(object):
-    def __init__(self):
+    def __init__(self, device=None):
         self.ocr_config = self.load_config()
+        if device is not None:
+            self.ocr_config['device'] = device
         self.detector = Predictor(self.ocr_config)
 
     def load_config(self):
@@ -20,8 +22,11 @@ class TextRecognition(object):
         # update base config
         ocr_config.update(vgg_config)
 
-        # load model from checkpoint
-        ocr_config['weights'] = text_recognition['model_weight']
+        # load model from checkpoint, nếu chưa có file local thì dùng weights/pretrain.cached trong config
+        if os.path.exists(text_recognition['model_weight']):
+            ocr_config['weights'] = text_recognition['model_weight']
+        ocr_config['cache_dir'] = OCR_CONFIG['cache_dir']
+        ocr_config['offline'] = OCR_CONFIG['offline']
         ocr_config['predictor']['beamsearch'] = False
 
         return ocr_config
@@ -34,7 +39,7 @@ class TextRecognition(object):
         return config
 
     def predict(self, image):
-        image = Image.fromarray(image)
+        """image: ndarray RGB"""
         result = self.detector.predict(image)
 
         return result
@@ -0,0 +1,139 @@
+"""Export model VietOCR (vgg-transformer) sang TorchScript để chạy bằng ScriptedPredictor"""
+import math
+import os
+
+import torch
+import yaml
+from torch import nn
+
+
+class EncoderExport(nn.Module):
+    """
+    CNN + transformer encoder, trả về luôn key/value cross-attention đã chiếu
+    của mọi decoder layer để decoder mỗi bước không phải chiếu lại memory.
+
+    Shape:
+        - img: (N, C, H, W)
+        - mem_k, mem_v: (L, N, H, S, D)
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.cnn = model.cnn
+        self.transformer = model.transformer
+
+    def forward(self, img):
+        memory = self.transformer.forward_encoder(self.cnn(img))
+
+        mem_k, mem_v = [], []
+        for layer in self.transformer.transformer.decoder.layers:
+            k, v = self.transformer.project_memory(layer, memory)
+            mem_k.append(k)
+            mem_v.append(v)
+
+        return torch.stack(mem_k), torch.stack(mem_v)
+
+
+class DecoderStepExport(nn.Module):
+    """
+    1 bước incremental decoding với cache self-attention dạng tensor
+    (tương đương LanguageTransformer.forward_decoder_step).
+
+    Shape:
+        - tgt: (N,) token vừa sinh
+        - step: (1,) vị trí của tgt trong chuỗi
+        - mem_k, mem_v: (L, N, H, S, D)
+        - k, v: (L, N, H, T, D) cache của các bước trước
+        - output: logits (N, V), k, v: (L, N, H, T + 1, D)
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.transformer = model.transformer
+
+    def forward(self, tgt, step, mem_k, mem_v, k, v):
+        transformer = self.transformer
+        x = transformer.embed_tgt(tgt).unsqueeze(0) * math.sqrt(transformer.d_model)
+        x = x + transformer.pos_enc.pe.index_select(0, step)
+
+        new_k, new_v = [], []
+        for i, layer in enumerate(transformer.transformer.decoder.layers):
+            x, layer_k, layer_v = transformer.decoder_layer_step(layer, x, k[i], v[i], mem_k[i], mem_v[i])
+            new_k.append(layer_k)
+            new_v.append(layer_v)
+
+        if transformer.transformer.decoder.norm is not None:
+            x = transformer.transformer.decoder.norm(x)
+
+        return transformer.fc(x[0]), torch.stack(new_k), torch.stack(new_v)
+
+
+def _freeze(module):
+    """Freeze weights thành hằng số trong graph (bỏ dropout, gộp Conv+BN, ...)"""
+    return torch.jit.freeze(module.eval())
+
+
+def export_torchscript(predictor, output_dir):
+    """
+    Trace encoder và decoder step của Predictor (vendored) rồi lưu vào output_dir:
+    encoder.pt, decoder.pt và config.yml (vocab + tham số tiền xử lý ảnh)
+
+    Args:
+        predictor: src.vietocr.tool.predictor.Predictor đã load weights
+        output_dir: str
+    """
+    model = predictor.model.eval()
+    config = predictor.config
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Ví dụ đầu vào chỉ dùng để trace, batch/chiều rộng/độ dài chuỗi vẫn động khi chạy
+    image_height = config['dataset']['image_height']
+    img = torch.rand(2, 3, image_height, 128, device=config['device'])
+
+    encoder = EncoderExport(model).eval()
+    decoder = DecoderStepExport(model).eval()
+
+    with torch.no_grad():
+        mem_k, mem_v = encoder(img)
+        num_layers, batch_size, num_heads, _, head_dim = mem_k.shape
+        cache = mem_k.new_zeros((num_layers, batch_size, num_heads, 1, head_dim))
+        tgt = torch.ones(batch_size, dtype=torch.long, device=img.device)
+        step = torch.ones(1, dtype=torch.long, device=img.device)
+
+        traced_encoder = _freeze(torch.jit.trace(encoder, img))
+        traced_decoder = _freeze(torch.jit.trace(decoder, (tgt, step, mem_k, mem_v, cache, cache)))
+
+    traced_encoder.save(os.path.join(output_dir, 'encoder.pt'))
+    traced_decoder.save(os.path.join(output_dir, 'decoder.pt'))
+
+    runtime_config = {
+        'vocab': config['vocab'],
+        'dataset': {key: config['dataset'][key] for key in ('image_height', 'image_min_width', 'image_max_width')},
+    }
+    with open(os.path.join(output_dir, 'config.yml'), 'w', encoding='utf-8') as f:
+        yaml.safe_dump(runtime_config, f, allow_unicode=True)
+
+    print(f"✓ Đã export TorchScript vào {output_dir}")
+
+
+def main():
+    """python -m src.vietocr.tool.export [--output DIR] [--quantize]"""
+    import argparse
+    from config.ocr import text_recognition
+    from src.vietocr.text_recognition import TextRecognition
+
+    parser = argparse.ArgumentParser(description="Export VietOCR vgg-transformer sang TorchScript")
+    parser.add_argument('--output', default=text_recognition['torchscript_dir'])
+    parser.add_argument('--quantize', action='store_true', help="Lượng tử hóa int8 trước khi export")
+    args = parser.parse_args()
+
+    predictor = TextRecognition(device='cpu').detector
+    if args.quantize:
+        from src.vietocr.tool.quantize import quantize_model
+        quantize_model(predictor.model)
+
+    export_torchscript(predictor, args.output)
+
+
+if __name__ == "__main__":
+    main()
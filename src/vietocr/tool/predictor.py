@@ -1,32 +1,40 @@
 import cv2
 import numpy as np
 import math
+import os
 import torch
+import yaml
 from collections import defaultdict
 
 
-from src.vietocr.tool.translate import build_model, translate
+from src.vietocr.model.vocab import Vocab
+from src.vietocr.tool.translate import build_model, translate, translate_scripted
+from src.vietocr.tool.utils import download_weights
 
 
 class Predictor(object):
     def __init__(self, config):
         device = config['device']
 
-        model, vocab = build_model(config)
-        weights = config['weights']
+        # Weights của cả model được load ngay sau đây, không cần weights ImageNet cho backbone
+        model, vocab = build_model(config, checkpoint=True)
+        pretrain = config.get('pretrain') or {}
+        weights = download_weights(config['weights'], cached=pretrain.get('cached'), md5=pretrain.get('md5'),
+                                   cache_dir=config.get('cache_dir'), offline=config.get('offline', False))
 
         model.load_state_dict(torch.load(weights, map_location=torch.device(device)))
 
         self.config = config
         self.model = model
         self.vocab = vocab
+        self.use_cache = config.get('predictor', {}).get('incremental', True)
 
     def predict(self, img):
         img = self.preprocess_input(img)
         img = np.expand_dims(img, axis=0)
         img = torch.FloatTensor(img)
         img = img.to(self.config['device'])
-        s = translate(img, self.model)[0].tolist()
+        s = self._translate(img)[0].tolist()
 
         s = self.vocab.decode(s)
 
@@ -45,7 +53,7 @@ class Predictor(object):
             batch = np.asarray(batch)
             batch = torch.FloatTensor(batch)
             batch = batch.to(self.config['device'])
-            sent = translate(batch, self.model).tolist()
+            sent = self._translate(batch).tolist()
 
             batch_text = self.vocab.batch_decode(sent)
             result.extend(batch_text)
@@ -57,6 +65,9 @@ class Predictor(object):
 
         return result
 
+    def _translate(self, img):
+        return translate(img, self.model, use_cache=self.use_cache)
+
     def preprocess_input(self, image):
         """
         param: image: ndarray of image
@@ -129,3 +140,30 @@ class Predictor(object):
         new_img = np.transpose(new_img, (2, 0, 1))
 
         return new_img
+
+
+class ScriptedPredictor(Predictor):
+    """
+    Predictor chạy encoder/decoder TorchScript đã export bằng src/vietocr/tool/export.py.
+    Không build model (không cần torchvision), tiền xử lý ảnh giống Predictor.
+    """
+
+    def __init__(self, export_dir, device='cpu'):
+        with open(os.path.join(export_dir, 'config.yml'), encoding='utf-8') as f:
+            config = yaml.safe_load(f)
+        config['device'] = device
+
+        self.config = config
+        self.model = None
+        self.vocab = Vocab(config['vocab'])
+        self.encoder = self._load_module(os.path.join(export_dir, 'encoder.pt'), device)
+        self.decoder = self._load_module(os.path.join(export_dir, 'decoder.pt'), device)
+
+    @staticmethod
+    def _load_module(path, device):
+        module = torch.jit.load(path, map_location=device)
+        # Tối ưu graph cho máy đang chạy (vd. oneDNN trên CPU), không lưu được vào file nên làm lúc load
+        return torch.jit.optimize_for_inference(module)
+
+    def _translate(self, img):
+        return translate_scripted(img, self.encoder, self.decoder)
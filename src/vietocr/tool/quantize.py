@@ -0,0 +1,105 @@
+"""INT8 dynamic quantization cho model VietOCR chạy trên CPU"""
+import time
+
+import torch
+from torch import nn
+
+
+def fuse_conv_bn(model):
+    """
+    Gộp BatchNorm2d vào Conv2d đứng ngay trước nó (chỉ dùng khi eval).
+    Dynamic quantization không hỗ trợ Conv2d nên CNN vẫn chạy fp32,
+    nhưng bỏ được 1 lượt BatchNorm sau mỗi conv của VGG19-bn.
+    """
+    for module in model.modules():
+        if not isinstance(module, nn.Sequential):
+            continue
+
+        for i in range(len(module) - 1):
+            conv, bn = module[i], module[i + 1]
+            if isinstance(conv, nn.Conv2d) and isinstance(bn, nn.BatchNorm2d):
+                module[i] = torch.nn.utils.fusion.fuse_conv_bn_eval(conv, bn)
+                module[i + 1] = nn.Identity()
+
+    return model
+
+
+def quantize_model(model):
+    """
+    Lượng tử hóa động int8 các lớp Linear (FFN của transformer, fc) và GRU/LSTM (seq2seq),
+    gộp Conv+BN cho CNN. Sửa trực tiếp trên model, chỉ dùng cho inference trên CPU.
+
+    Args:
+        model: VietOCR (nn.Module) đã load weights
+
+    Returns:
+        nn.Module: model đã lượng tử hóa
+    """
+    model.eval()
+    fuse_conv_bn(model)
+    return torch.quantization.quantize_dynamic(model, {nn.Linear, nn.GRU, nn.LSTM}, dtype=torch.qint8, inplace=True)
+
+
+def edit_distance(a, b):
+    """Khoảng cách Levenshtein giữa 2 chuỗi"""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        prev = cur
+    return prev[-1]
+
+
+def compare_predictions(reference, predictions):
+    """
+    So sánh kết quả OCR với kết quả tham chiếu (fp32)
+
+    Returns:
+        dict: exact_match (tỷ lệ dòng giống hệt), cer (character error rate), mismatches (list index)
+    """
+    errors = sum(edit_distance(ref, pred) for ref, pred in zip(reference, predictions))
+    chars = sum(len(ref) for ref in reference)
+    mismatches = [i for i, (ref, pred) in enumerate(zip(reference, predictions)) if ref != pred]
+
+    return {
+        'exact_match': 1 - len(mismatches) / len(reference) if reference else 1.0,
+        'cer': errors / chars if chars else 0.0,
+        'mismatches': mismatches,
+    }
+
+
+def main():
+    """Kiểm tra độ chính xác và tốc độ của model int8 so với fp32 trên 1 folder ảnh dòng text"""
+    import argparse
+    from src.extraction.ocr_engine import OCR_BACKENDS, get_ocr_engine, _load_line_crops
+
+    parser = argparse.ArgumentParser(description="So sánh VietOCR int8 với fp32")
+    parser.add_argument('crops_dir', help="Folder chứa ảnh các dòng text đã cắt")
+    parser.add_argument('--backend', choices=list(OCR_BACKENDS), default=None)
+    args = parser.parse_args()
+
+    names, images = _load_line_crops(args.crops_dir)
+    if not images:
+        parser.error(f"Không có ảnh nào trong {args.crops_dir}")
+
+    timings = {}
+    outputs = {}
+    for quantize in (False, True):
+        engine = get_ocr_engine(args.backend, device='cpu', quantize=quantize).load()
+        start = time.perf_counter()
+        outputs[quantize] = engine.predict_batch(images)
+        timings[quantize] = (time.perf_counter() - start) / len(images) * 1000
+
+    result = compare_predictions(outputs[False], outputs[True])
+    for i in result['mismatches']:
+        print(f"{names[i]}: fp32='{outputs[False][i]}' int8='{outputs[True][i]}'")
+
+    print(f"Số dòng: {len(images)}")
+    print(f"Exact match: {result['exact_match'] * 100:.1f}%  CER: {result['cer'] * 100:.2f}%")
+    print(f"fp32: {timings[False]:.1f} ms/dòng  int8: {timings[True]:.1f} ms/dòng  "
+          f"(x{timings[False] / timings[True]:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,49 +1,125 @@
 import torch
-import numpy as np
 
 from src.vietocr.transformerocr import VietOCR
 from src.vietocr.model.vocab import Vocab
 
 
-def translate(img, model, max_seq_length=128, sos_token=1, eos_token=2):
-    """data: BxCXHxW"""
+def translate(img, model, max_seq_length=128, sos_token=1, eos_token=2, use_cache=True):
+    """data: BxCXHxW
+
+    use_cache=True: decode từng token một, cache key/value của decoder
+    (xem LanguageTransformer.forward_decoder_step) thay vì chạy lại cả chuỗi mỗi bước.
+    """
     model.eval()
-    device = img.device
 
     with torch.no_grad():
         src = model.cnn(img)
         memory = model.transformer.forward_encoder(src)
 
-        translated_sentence = [[sos_token] * len(img)]
-        max_length = 0
+        if use_cache:
+            cache = model.transformer.init_decoder_cache(memory)
+
+            def step(tokens, length):
+                return model.transformer.forward_decoder_step(tokens[:, -1], cache)
+
+            def select(keep):
+                model.transformer.select_decoder_cache(cache, keep)
+        else:
+            state = {'memory': memory}
 
-        while max_length <= max_seq_length and not all(np.any(np.asarray(translated_sentence).T == eos_token, axis=1)):
-            tgt_inp = torch.LongTensor(translated_sentence).to(device)
-            output, memory = model.transformer.forward_decoder(tgt_inp, memory)
-            output = output.to('cpu')
+            def step(tokens, length):
+                output, _ = model.transformer.forward_decoder(tokens.transpose(0, 1), state['memory'])
+                return output[:, -1]
 
-            _, indices = torch.topk(output, 5)
+            def select(keep):
+                state['memory'] = state['memory'].index_select(1, keep)
 
-            indices = indices[:, -1, 0]
-            indices = indices.tolist()
+        translated_sentence = greedy_decode(step, select, len(img), img.device, max_seq_length, sos_token, eos_token)
+
+    return translated_sentence
 
-            translated_sentence.append(indices)
-            max_length += 1
 
-            del output
+def translate_scripted(img, encoder, decoder_step, max_seq_length=128, sos_token=1, eos_token=2):
+    """
+    Như translate() nhưng chạy encoder/decoder đã export bằng TorchScript (xem tool/export.py).
 
-        translated_sentence = np.asarray(translated_sentence).T
+    encoder(img) -> (mem_k, mem_v): (L, N, H, S, D)
+    decoder_step(tgt, step, mem_k, mem_v, k, v) -> (logits, k, v)
+    """
+    with torch.no_grad():
+        mem_k, mem_v = encoder(img)
+        num_layers, batch_size, num_heads, _, head_dim = mem_k.shape
+        empty = mem_k.new_zeros((num_layers, batch_size, num_heads, 0, head_dim))
+        state = {'mem_k': mem_k, 'mem_v': mem_v, 'k': empty, 'v': empty}
+
+        def step(tokens, length):
+            position = torch.tensor([length - 1], dtype=torch.long, device=img.device)
+            logits, state['k'], state['v'] = decoder_step(
+                tokens[:, -1], position, state['mem_k'], state['mem_v'], state['k'], state['v'])
+            return logits
+
+        def select(keep):
+            for key in state:
+                state[key] = state[key].index_select(1, keep)
+
+        translated_sentence = greedy_decode(step, select, len(img), img.device, max_seq_length, sos_token, eos_token)
 
     return translated_sentence
 
 
-def build_model(config):
+def greedy_decode(step, select, batch_size, device, max_seq_length=128, sos_token=1, eos_token=2):
+    """
+    Vòng lặp greedy decoding dùng chung cho các kiểu decoder.
+
+    step(tokens, length): tokens (n, length) của các dòng đang decode -> logits (n, V) cho token tiếp theo
+    select(keep): giữ lại các dòng keep (index trong batch đang decode) trong state của decoder
+
+    Các dòng đã sinh eos_token được loại khỏi batch đang decode (kèm memory/cache),
+    vòng lặp dừng ngay khi dòng dài nhất kết thúc. Phần sau eos được điền eos_token.
+
+    Returns:
+        ndarray (B, T): token id, bắt đầu bằng sos_token
+    """
+    translated_sentence = torch.full((batch_size, max_seq_length + 2), eos_token, dtype=torch.long, device=device)
+    translated_sentence[:, 0] = sos_token
+
+    # Chỉ số (trong batch gốc) của các dòng chưa sinh eos
+    active = torch.arange(batch_size, device=device)
+
+    length = 1
+    while length <= max_seq_length + 1 and len(active) > 0:
+        output = step(translated_sentence[active, :length], length)
+
+        indices = output.argmax(dim=-1)
+        translated_sentence[active, length] = indices
+        length += 1
+
+        del output
+
+        unfinished = indices != eos_token
+        if not bool(unfinished.all()):
+            keep = unfinished.nonzero(as_tuple=True)[0]
+            active = active[keep]
+            select(keep)
+
+    return translated_sentence[:, :length].cpu().numpy()
+
+
+def build_model(config, checkpoint=False):
+    """
+    checkpoint=True: weights của cả model sẽ được load_state_dict ngay sau đó,
+    CNN backbone được tạo mà không tải weights ImageNet và không khởi tạo ngẫu nhiên
+    """
     vocab = Vocab(config['vocab'])
     device = config['device']
+
+    cnn_args = dict(config['cnn'])
+    if checkpoint:
+        cnn_args['pretrained'] = None
     
     model = VietOCR(len(vocab),
             config['backbone'],
-            config['cnn'], 
+            cnn_args, 
             config['transformer'],
             config['seq_modeling'])
     
@@ -0,0 +1,79 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import urllib.request
+
+
+def md5sum(path, chunk_size=1 << 20):
+    md5 = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            md5.update(chunk)
+    return md5.hexdigest()
+
+
+def cache_filename(uri):
+    """Tên file cache hợp lệ trên mọi hệ điều hành cho 1 URL (vd. '...uc?id=xxx' -> 'uc_id_xxx')"""
+    return re.sub(r'[^\w.-]', '_', uri.rstrip('/').split('/')[-1])
+
+
+def download_weights(uri, cached=None, md5=None, cache_dir=None, offline=False):
+    """
+    Trả về đường dẫn local của file weights.
+
+    - uri là đường dẫn local: dùng trực tiếp
+    - uri là URL: dùng file đã có ở `cached` (pretrain.cached trong config), cache_dir
+      hoặc thư mục tạm (nơi gói vietocr pip tự lưu); chưa có thì tải về `cached`/cache_dir.
+      offline=True thì không bao giờ tải, báo lỗi nếu cache chưa có file.
+    - md5 chỉ được kiểm tra sau khi tải để không phải đọc lại file lớn mỗi lần khởi động
+    """
+    if not uri.startswith('http'):
+        if not os.path.exists(uri):
+            raise FileNotFoundError(f"Không tìm thấy file weights: {uri}")
+        return uri
+
+    filename = cache_filename(uri)
+    candidates = []
+    if cached:
+        candidates.append(cached)
+    if cache_dir:
+        candidates.append(os.path.join(cache_dir, filename))
+    candidates.append(os.path.join(tempfile.gettempdir(), filename))
+
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+
+    if offline:
+        raise FileNotFoundError(
+            f"Chế độ offline: chưa có weights cho {uri}. "
+            f"Hãy copy file weights vào một trong các đường dẫn: {', '.join(candidates)}"
+        )
+
+    path = candidates[0]
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    # Mỗi lần tải dùng 1 file tạm riêng: nhiều process (vd. worker của batch CLI) tải cùng lúc
+    # không ghi đè file của nhau, file hoàn chỉnh được đổi tên nguyên tử thành path
+    with tempfile.NamedTemporaryFile(dir=directory, prefix=filename + '.', suffix='.part', delete=False) as f:
+        tmp_path = f.name
+
+    print(f"Đang tải weights {uri} -> {path}")
+    try:
+        if 'drive.google.com' in uri:
+            import gdown
+            gdown.download(uri, tmp_path, quiet=False)
+        else:
+            with urllib.request.urlopen(uri) as response, open(tmp_path, 'wb') as f:
+                shutil.copyfileobj(response, f)
+
+        if md5 and md5sum(tmp_path) != md5:
+            raise RuntimeError(f"File weights tải từ {uri} sai md5, hãy thử tải lại")
+
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path